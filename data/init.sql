@@ -7,7 +7,68 @@ CREATE TABLE topics (
     title TEXT,
     subtitle TEXT,
     content TEXT,
-    url TEXT UNIQUE
+    url TEXT UNIQUE,
+    -- Identifiant stable de la source et empreinte du texte embeddé (chargement incrémental)
+    source_id TEXT,
+    content_hash TEXT,
+    -- Copies compactes de `embedding` pour la recherche en deux étapes (RETRIEVER_VECTOR_STORAGE) :
+    -- demi-précision, préfixe Matryoshka (256 premières dimensions) et quantification binaire.
+    embedding_half HALFVEC(768),
+    embedding_prefix HALFVEC(256),
+    embedding_bits BIT(768),
+    -- Vecteur plein texte précalculé (titre > sous-titre > contenu) pour la recherche hybride
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('french', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('french', coalesce(subtitle, '')), 'B') ||
+        setweight(to_tsvector('french', coalesce(content, '')), 'C')
+    ) STORED
 );
 
-CREATE INDEX idx_topics_embedding ON topics USING ivfflat (embedding vector_l2_ops) WITH (lists = 100);
+CREATE INDEX idx_topics_search_vector ON topics USING gin (search_vector);
+
+-- Les requêtes utilisent la distance cosinus (<=>) : l'opclass doit être vector_cosine_ops.
+-- HNSW se construit correctement sur une table vide ; pour IVFFlat, reconstruire après chargement
+-- via `python -m app.interface.cli.vector_index build --method ivfflat --rebuild`.
+CREATE INDEX idx_topics_embedding ON topics USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- Découpage des sujets en passages (fenêtres de tokens avec recouvrement) pour la recherche fine.
+CREATE TABLE topic_chunks (
+    id bigserial PRIMARY KEY,
+    topic_id BIGINT NOT NULL REFERENCES topics(id) ON DELETE CASCADE,
+    chunk_index INT NOT NULL,
+    content TEXT NOT NULL,
+    token_count INT NOT NULL,
+    embedding VECTOR(768),
+    embedding_half HALFVEC(768),
+    embedding_prefix HALFVEC(256),
+    embedding_bits BIT(768),
+    UNIQUE (topic_id, chunk_index)
+);
+
+CREATE INDEX idx_topic_chunks_embedding ON topic_chunks USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- Les index des colonnes compactes ne sont créés que si l'API les interroge :
+-- `RETRIEVER_VECTOR_STORAGE=binary python -m app.interface.cli.vector_index build`.
+
+-- Révision du corpus, incrémentée à chaque modification de `topics` :
+-- l'API s'en sert pour invalider ses caches de réponses après un rechargement.
+CREATE TABLE corpus_revisions (
+    name TEXT PRIMARY KEY,
+    revision BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO corpus_revisions (name) VALUES ('topics');
+
+CREATE FUNCTION bump_corpus_revision() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO corpus_revisions (name, revision) VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (name) DO UPDATE
+        SET revision = corpus_revisions.revision + 1, updated_at = now();
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER topics_bump_revision
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON topics
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_corpus_revision();
@@ -19,6 +19,18 @@ class AskRequest(BaseModel):
         le=10,
         description="Nombre maximum de documents à citer (optionnel).",
     )
+    probes: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=1000,
+        description="Nombre de listes IVFFlat explorées (optionnel, compromis rappel/latence).",
+    )
+    ef_search: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=1000,
+        description="Taille de la liste de candidats HNSW (optionnel, compromis rappel/latence).",
+    )
 
 
 class AskDocument(BaseModel):
@@ -44,4 +56,78 @@ class AskResponse(BaseModel):
     )
 
 
-__all__ = ["AskRequest", "AskDocument", "AskResponse"]
+class AskBatchRequest(BaseModel):
+    """Incoming payload for the /api/ask/batch endpoints."""
+
+    questions: List[str] = Field(
+        ...,
+        min_length=1,
+        description="Questions à traiter, dans l'ordre (limite : ASK_BATCH_MAX_QUESTIONS).",
+    )
+    top_k: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=10,
+        description="Nombre maximum de documents à citer par question (optionnel).",
+    )
+    probes: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=1000,
+        description="Nombre de listes IVFFlat explorées (optionnel, compromis rappel/latence).",
+    )
+    ef_search: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=1000,
+        description="Taille de la liste de candidats HNSW (optionnel, compromis rappel/latence).",
+    )
+    concurrency: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=64,
+        description=(
+            "Nombre maximum de réponses générées en parallèle "
+            "(optionnel, plafonné par ASK_BATCH_CONCURRENCY)."
+        ),
+    )
+
+
+class AskBatchItem(BaseModel):
+    """Outcome of one question of a batch: an answer or an error."""
+
+    index: int = Field(..., ge=0, description="Position de la question dans la requête.")
+    question: str = Field(..., description="Question telle que reçue.")
+    answer: Optional[str] = Field(default=None, description="Réponse formulée par l'assistant.")
+    documents: List[AskDocument] = Field(
+        default_factory=list,
+        description="Documents cités pour appuyer la réponse.",
+    )
+    status: int = Field(
+        default=200,
+        description="Code HTTP équivalent pour cette question (200, 400, 502 ou 503).",
+    )
+    error: Optional[str] = Field(default=None, description="Message d'erreur éventuel.")
+    retry_after: Optional[int] = Field(
+        default=None,
+        description="Délai conseillé (secondes) avant de réessayer une question refusée (503).",
+    )
+
+
+class AskBatchResponse(BaseModel):
+    """Answers of a batch, in the order of the questions."""
+
+    results: List[AskBatchItem] = Field(
+        default_factory=list,
+        description="Un résultat par question, dans l'ordre de la requête.",
+    )
+
+
+__all__ = [
+    "AskRequest",
+    "AskDocument",
+    "AskResponse",
+    "AskBatchRequest",
+    "AskBatchItem",
+    "AskBatchResponse",
+]
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.config import settings
+from app.domain.models.ask import AskResponse
+from app.infrastructure.metrics import REGISTRY
+from app.infrastructure.repositories.topics import fetch_corpus_revision
+
+logger = logging.getLogger(__name__)
+
+LOOKUPS = Counter(
+    "chatbot_answer_cache_lookups_total",
+    "Semantic answer cache lookups by result.",
+    ["result"],
+    registry=REGISTRY,
+)
+SECONDS_SAVED = Counter(
+    "chatbot_answer_cache_seconds_saved_total",
+    "Generation time avoided by serving cached answers.",
+    registry=REGISTRY,
+)
+HIT_SIMILARITY = Histogram(
+    "chatbot_answer_cache_hit_similarity",
+    "Cosine similarity between the question and the cached one on a hit.",
+    buckets=(0.9, 0.92, 0.94, 0.95, 0.96, 0.97, 0.98, 0.99, 0.995, 1.0),
+    registry=REGISTRY,
+)
+ENTRIES = Gauge(
+    "chatbot_answer_cache_entries",
+    "Answers held in the semantic answer cache.",
+    registry=REGISTRY,
+)
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    if norm == 0.0:
+        return array.copy()
+    return array / norm
+
+
+@dataclass
+class _CachedAnswer:
+    topic_ids: Tuple[int, ...]
+    response: AskResponse
+    generation_seconds: float
+
+
+class SemanticAnswerCache:
+    """Reuse answers for paraphrased questions grounded on the same documents.
+
+    A cached answer is served when the new question embedding is within
+    ``threshold`` cosine similarity of a cached one *and* retrieval returned
+    the same topics in the same order (the answer cites them as ``[DocN]``).
+    Entries are dropped whenever the ``topics`` corpus revision changes.
+
+    Entry embeddings live in one preallocated float32 matrix (one row per
+    slot), so a lookup is a single matrix-vector product plus ``argmax``.
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        max_entries: int,
+        ttl: float,
+        revision_check_seconds: float,
+    ) -> None:
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl if ttl > 0 else None
+        self.revision_check_seconds = max(0.0, revision_check_seconds)
+        # Slot -> entry, least recently used first.
+        self._entries: "OrderedDict[int, _CachedAnswer]" = OrderedDict()
+        self._free: List[int] = list(range(self.max_entries))
+        self._vectors: Optional[np.ndarray] = None
+        self._active = np.zeros(self.max_entries, dtype=bool)
+        self._keys = np.zeros(self.max_entries, dtype=np.int64)
+        self._expires_at = np.full(self.max_entries, np.inf)
+        self._revision: Optional[int] = None
+        self._checked_at = float("-inf")
+
+    async def _is_valid(self) -> bool:
+        """Refresh the corpus revision; entries are only usable when it is known."""
+
+        now = time.monotonic()
+        if now - self._checked_at < self.revision_check_seconds:
+            return self._revision is not None
+
+        self._checked_at = now
+        try:
+            revision = await fetch_corpus_revision()
+        except Exception as exc:  # pragma: no cover - defensive guard
+            logger.warning("Unable to read corpus revision, answer cache bypassed: %s", exc)
+            revision = None
+
+        if revision != self._revision:
+            self.clear()
+            self._revision = revision
+
+        return revision is not None
+
+    async def lookup(
+        self, embedding: np.ndarray, topic_ids: Sequence[int]
+    ) -> Optional[AskResponse]:
+        if not await self._is_valid():
+            return None
+
+        key = tuple(topic_ids)
+        query = _unit(embedding)
+
+        for slot in np.flatnonzero(self._active & (self._expires_at < time.monotonic())):
+            self._remove(int(slot))
+        ENTRIES.set(len(self._entries))
+
+        candidates = self._active & (self._keys == hash(key))
+        if (
+            self._vectors is None
+            or query.shape != self._vectors.shape[1:]
+            or not candidates.any()
+        ):
+            LOOKUPS.labels(result="miss").inc()
+            return None
+
+        scores = np.where(candidates, self._vectors @ query, -np.inf)
+        slot = int(np.argmax(scores))
+        similarity = float(scores[slot])
+        entry = self._entries[slot]
+
+        # Hashes of different topic lists may (very rarely) collide.
+        if similarity < self.threshold or entry.topic_ids != key:
+            LOOKUPS.labels(result="miss").inc()
+            return None
+
+        self._entries.move_to_end(slot)
+
+        LOOKUPS.labels(result="hit").inc()
+        HIT_SIMILARITY.observe(similarity)
+        SECONDS_SAVED.inc(entry.generation_seconds)
+        return entry.response
+
+    async def store(
+        self,
+        embedding: np.ndarray,
+        topic_ids: Sequence[int],
+        response: AskResponse,
+        generation_seconds: float,
+    ) -> None:
+        if not await self._is_valid():
+            return
+
+        vector = _unit(embedding)
+        if self._vectors is None or self._vectors.shape[1:] != vector.shape:
+            # First entry, or the embedding model changed: older rows are not comparable.
+            self.clear()
+            self._vectors = np.zeros((self.max_entries, *vector.shape), dtype=np.float32)
+
+        if not self._free:
+            self._remove(next(iter(self._entries)))
+        slot = self._free.pop()
+
+        key = tuple(topic_ids)
+        self._vectors[slot] = vector
+        self._keys[slot] = hash(key)
+        self._expires_at[slot] = time.monotonic() + self.ttl if self.ttl else np.inf
+        self._active[slot] = True
+        self._entries[slot] = _CachedAnswer(
+            topic_ids=key,
+            response=response,
+            generation_seconds=generation_seconds,
+        )
+
+        ENTRIES.set(len(self._entries))
+
+    def _remove(self, slot: int) -> None:
+        del self._entries[slot]
+        self._active[slot] = False
+        self._free.append(slot)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._free = list(range(self.max_entries))
+        self._active[:] = False
+        ENTRIES.set(0)
+
+
+_CACHE: SemanticAnswerCache | None = None
+
+
+def get_answer_cache() -> SemanticAnswerCache | None:
+    """Return the process-wide semantic answer cache, or ``None`` if disabled."""
+
+    global _CACHE
+
+    if not settings.answer_cache_enabled:
+        return None
+
+    if _CACHE is None:
+        _CACHE = SemanticAnswerCache(
+            threshold=settings.answer_cache_similarity_threshold,
+            max_entries=settings.answer_cache_max_entries,
+            ttl=settings.answer_cache_ttl_seconds,
+            revision_check_seconds=settings.answer_cache_revision_check_seconds,
+        )
+    return _CACHE
+
+
+__all__ = ["SemanticAnswerCache", "get_answer_cache"]
@@ -1,12 +1,49 @@
 from __future__ import annotations
 
-from typing import List
+import asyncio
+import time
+from functools import lru_cache
+from typing import (
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Mapping,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
 
 from app.config import settings
-from app.domain.models.ask import AskDocument, AskRequest, AskResponse
-from app.domain.services.chat import LLMServiceError, request_ollama_chat
-from app.infrastructure.embeddings import EmbeddingServiceError, request_embedding
-from app.infrastructure.repositories.topics import query_similar_topics
+from app.domain.models.ask import (
+    AskBatchItem,
+    AskBatchRequest,
+    AskBatchResponse,
+    AskDocument,
+    AskRequest,
+    AskResponse,
+)
+from app.domain.services.answer_cache import get_answer_cache
+from app.domain.services.context_assembler import ContextSource, assemble_context
+from app.domain.services.retrieval import retrieve_topics, retrieve_topics_batch
+from app.domain.services.chat import (
+    LLMOverloadedError,
+    LLMServiceError,
+    request_ollama_chat,
+    stream_ollama_chat,
+)
+from app.domain.services.tokens import estimate_tokens
+from app.infrastructure.embedding_cache import normalize_question
+from app.infrastructure.embeddings import (
+    EmbeddingServiceError,
+    request_embedding,
+    request_question_embeddings,
+)
+from app.infrastructure.single_flight import SingleFlight, StreamSingleFlight
+from app.infrastructure.timing import timed_stage
 
 
 class AskServiceError(RuntimeError):
@@ -21,16 +58,16 @@ class AnswerGenerationError(AskServiceError):
     """Raised when the LLM fails to generate a grounded answer."""
 
 
-def _build_excerpt(content: str | None, limit: int) -> str:
-    if not content:
-        return "Contenu indisponible."
+class AnswerGenerationOverloadedError(AnswerGenerationError):
+    """Raised when the LLM admission queue is full."""
 
-    snippet = content.strip()
-    if len(snippet) <= limit:
-        return snippet
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
 
-    truncated = snippet[:limit].rsplit(" ", 1)[0].rstrip()
-    return f"{truncated}…"
+
+_ASKS_IN_FLIGHT: SingleFlight[AskResponse] = SingleFlight("ask")
+_STREAMS_IN_FLIGHT: StreamSingleFlight[List[AskDocument]] = StreamSingleFlight("ask_stream")
 
 
 def _format_context(documents: List[AskDocument]) -> str:
@@ -45,107 +82,403 @@ def _format_context(documents: List[AskDocument]) -> str:
     return "\n\n".join(parts) if parts else ""
 
 
-async def handle_ask(request: AskRequest) -> AskResponse:
-    """Process the ask request end-to-end."""
+NO_DOCUMENT_ANSWER = (
+    "Je n'ai trouvé aucun document pertinent dans la base de connaissances. "
+    "Pouvez-vous reformuler ou fournir davantage de contexte ?"
+)
+
+SYSTEM_PROMPT = (
+    "Vous êtes un assistant expert spécialisé dans le milieu de l’insertion socio‑professionnelle, à l’accompagnement des personnes éloignées de l’emploi, et aux dispositifs publics en France (ex. PMSMP, accompagnement, dispositif public, prestataires, droits, obligations).\n"
+    "Vous devez :\n"
+    "1. Répondre **en français**, de façon claire, factuelle, structurée (paragraphes, listes si utile).\n"
+    "2. Ne mentionner dans votre réponse que les informations **strictement issues des documents de la base** (les fiches scrappées).\n"
+    "3. Chaque fois que vous citez une donnée / règle / information provenant d’une fiche, indiquer explicitement son identifiant (ex. `[Doc12]`, `[Doc5]`).\n"
+    "4. Si une question demande une information **non présente dans les documents**, l’indiquer clairement, de sorte que l’utilisateur sache que la source n’a pas fourni cette réponse.\n"
+    "5. Ne pas halluciner : ne pas inventer des dispositifs, articles ou chiffres non présents dans vos documents, sauf si vous avez la certitude (et toujours en précisant la source).\n"
+    "6. Si la question porte sur une mise à jour récente (loi, jurisprudence) ou une zone d’incertitude, vous pouvez signaler les limites, et recommander à l’utilisateur de vérifier les textes officiels ou sources actualisées."
+    "\n\n"
+    "Même si aucune réponse exacte n’est disponible, propose des éléments proches ou des démarches pour trouver l’information recherchée.\n"
+    "\n\n"
+    "**Objectif :** servir de “point de vérité” extrait des fiches de la “Communauté de l’Inclusion”, et aider l’utilisateur à approfondir ses recherches via ces documents internes.\n" 
+)
+
+
+def _top_k(request: AskRequest | AskBatchRequest) -> int:
+    top_k = request.top_k or settings.retriever_top_k
+    return max(1, min(top_k, 10))
+
+
+def _coalescing_key(request: AskRequest) -> Hashable:
+    """Requests sharing this key get the same documents and answer."""
+
+    return (
+        normalize_question(request.question),
+        _top_k(request),
+        request.probes,
+        request.ef_search,
+    )
+
+
+async def _retrieve_documents(
+    request: AskRequest,
+) -> Tuple[str, np.ndarray, List[AskDocument]]:
+    """Embed the question and return it with its embedding and retrieved documents."""
 
     query = request.question.strip()
     if not query:
         raise AskServiceError("La question ne peut pas être vide.")
 
-    top_k = request.top_k or settings.retriever_top_k
-    top_k = max(1, min(top_k, 10))
+    top_k = _top_k(request)
 
     try:
-        embedding = await request_embedding(query)
+        with timed_stage("embedding"):
+            embedding = await request_embedding(query)
     except EmbeddingServiceError as exc:
         raise RetrievalServiceError(str(exc)) from exc
 
     try:
-        rows = await query_similar_topics(embedding, top_k, query)
+        with timed_stage("retrieval"):
+            rows = await retrieve_topics(
+                embedding,
+                top_k,
+                query,
+                probes=request.probes,
+                ef_search=request.ef_search,
+            )
     except Exception as exc:  # pragma: no cover - defensive guard
         raise RetrievalServiceError("Erreur lors de la recherche vectorielle") from exc
 
-    documents: List[AskDocument] = []
-    char_limit = max(200, settings.retriever_context_char_limit)
-
-    for index, row in enumerate(rows, start=1):
-        similarity = float(row.get("similarity") or 0.0)
-        if similarity < 0.0:
-            similarity = 0.0
-        elif similarity > 1.0:
-            similarity = 1.0
-
-        excerpt = _build_excerpt(row.get("content"), char_limit)
-
-        documents.append(
-            AskDocument(
-                rank=index,
-                topic_id=int(row["id"]),
-                title=row.get("title"),
-                url=row.get("url"),
-                excerpt=excerpt,
-                similarity=similarity,
-            )
+    return query, embedding, _documents_from_rows(query, rows)
+
+
+def _documents_from_rows(query: str, rows: Sequence[Mapping[str, object]]) -> List[AskDocument]:
+    """Fit the retrieved rows into the context budget of ``query`` as citable documents."""
+
+    sources = [
+        ContextSource(
+            row=row,
+            similarity=min(1.0, max(0.0, float(row.get("similarity") or 0.0))),
+        )
+        for row in rows
+    ]
+    with timed_stage("context"):
+        assembled = assemble_context(sources, _context_budget(query))
+
+    # Ranks are renumbered so that ``[DocN]`` matches what the prompt shows.
+    return [
+        AskDocument(
+            rank=index,
+            topic_id=int(document.row["id"]),
+            title=document.row.get("title"),
+            url=document.row.get("url"),
+            excerpt=document.excerpt,
+            similarity=document.similarity,
         )
+        for index, document in enumerate(assembled, start=1)
+    ]
+
+
+USER_PROMPT_TEMPLATE = (
+    "Question : {query}\n\n"
+    "Contexte disponible (extraits / documents pertinents) :\n"
+    "{context}\n\n"
+    "**Instructions pour la réponse :**"  
+    "- Donne une réponse factuelle, concise et structurée."
+    "- Evite les généralités, les formules vagues ou les réponses hors sujet."
+    "- Gardes en tête que tu dois toujours envisager ta réponse dans le contexte de l'insertion socio-professionnelle et de l'inclusion par l'activité économique."
+    "- Bases-toi en priorité sur les informations présentes dans le contexte."
+    "- Quand tu cites une information, indique l’identifiant du document (ex. `[Doc3]`, `[Doc7]`).  "
+    "- Si une partie de la réponse demandée n’est pas couverte par le contexte, indique clairement : « Je n’ai pas trouvé d’information dans les documents fournis concernant … ».  "
+    "- Si tu peux proposer une piste ou question complémentaire (sans l’imposer), tu peux l’ajouter à la fin (en précisant que c’est une suggestion)."
+    "\n\n"
+    "Répond maintenant à la question :  \n**{query}**"
+)
+
+# Built once: every /ask prompt starts with this exact message.
+SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
+
+@lru_cache(maxsize=4)
+def _estimated_template_tokens(chars_per_token: float) -> int:
+    """Estimated tokens of the fixed part of the prompt (``LLM_CHARS_PER_TOKEN``
+    heuristic, not the model tokenizer), computed once per setting."""
+
+    return estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(
+        USER_PROMPT_TEMPLATE.format(query="", context="")
+    )
+
+
+def _context_budget(query: str) -> int:
+    """Tokens left for the documents once the template and the question are placed."""
+
+    fixed = _estimated_template_tokens(settings.llm_chars_per_token) + 2 * estimate_tokens(query)
+    return min(settings.ask_context_max_tokens, max(0, settings.ask_prompt_max_tokens - fixed))
+
+
+def _build_messages(query: str, documents: List[AskDocument]) -> List[Dict[str, str]]:
+    user_prompt = USER_PROMPT_TEMPLATE.format(query=query, context=_format_context(documents))
+    return [SYSTEM_MESSAGE, {"role": "user", "content": user_prompt}]
+
+
+async def handle_ask(request: AskRequest) -> AskResponse:
+    """Process the ask request end-to-end.
+
+    Identical questions already in flight are not processed twice: the
+    duplicates await the response of the first one.
+    """
+
+    if not settings.request_coalescing_enabled:
+        return await _answer(request)
+    return await _ASKS_IN_FLIGHT.do(_coalescing_key(request), lambda: _answer(request))
+
+
+async def _answer(request: AskRequest) -> AskResponse:
+    query, embedding, documents = await _retrieve_documents(request)
 
     if not documents:
-        return AskResponse(
-            answer=(
-                "Je n'ai trouvé aucun document pertinent dans la base de connaissances. "
-                "Pouvez-vous reformuler ou fournir davantage de contexte ?"
-            ),
-            documents=[],
-        )
+        return AskResponse(answer=NO_DOCUMENT_ANSWER, documents=[])
 
-    context = _format_context(documents)
-
-    system_prompt = (
-        "Vous êtes un assistant expert spécialisé dans le milieu de l’insertion socio‑professionnelle, à l’accompagnement des personnes éloignées de l’emploi, et aux dispositifs publics en France (ex. PMSMP, accompagnement, dispositif public, prestataires, droits, obligations).\n"
-        "Vous devez :\n"
-        "1. Répondre **en français**, de façon claire, factuelle, structurée (paragraphes, listes si utile).\n"
-        "2. Ne mentionner dans votre réponse que les informations **strictement issues des documents de la base** (les fiches scrappées).\n"
-        "3. Chaque fois que vous citez une donnée / règle / information provenant d’une fiche, indiquer explicitement son identifiant (ex. `[Doc12]`, `[Doc5]`).\n"
-        "4. Si une question demande une information **non présente dans les documents**, l’indiquer clairement, de sorte que l’utilisateur sache que la source n’a pas fourni cette réponse.\n"
-        "5. Ne pas halluciner : ne pas inventer des dispositifs, articles ou chiffres non présents dans vos documents, sauf si vous avez la certitude (et toujours en précisant la source).\n"
-        "6. Si la question porte sur une mise à jour récente (loi, jurisprudence) ou une zone d’incertitude, vous pouvez signaler les limites, et recommander à l’utilisateur de vérifier les textes officiels ou sources actualisées."
-        "\n\n"
-        "Même si aucune réponse exacte n’est disponible, propose des éléments proches ou des démarches pour trouver l’information recherchée.\n"
-        "\n\n"
-        "**Objectif :** servir de “point de vérité” extrait des fiches de la “Communauté de l’Inclusion”, et aider l’utilisateur à approfondir ses recherches via ces documents internes.\n" 
-    )
+    return await _generate_answer(query, embedding, documents)
 
-    user_prompt = (
-        f"Question : {query}\n\n"
-        "Contexte disponible (extraits / documents pertinents) :\n"
-        f"{context}\n\n"
-        "**Instructions pour la réponse :**"  
-        "- Donne une réponse factuelle, concise et structurée."
-        "- Evite les généralités, les formules vagues ou les réponses hors sujet."
-        "- Gardes en tête que tu dois toujours envisager ta réponse dans le contexte de l'insertion socio-professionnelle et de l'inclusion par l'activité économique."
-        "- Bases-toi en priorité sur les informations présentes dans le contexte."
-        "- Quand tu cites une information, indique l’identifiant du document (ex. `[Doc3]`, `[Doc7]`).  "
-        "- Si une partie de la réponse demandée n’est pas couverte par le contexte, indique clairement : « Je n’ai pas trouvé d’information dans les documents fournis concernant … ».  "
-        "- Si tu peux proposer une piste ou question complémentaire (sans l’imposer), tu peux l’ajouter à la fin (en précisant que c’est une suggestion)."
-        "\n\n"
-        f"Répond maintenant à la question :  \n**{query}**"
-    )
 
+async def _generate_answer(
+    query: str,
+    embedding: np.ndarray,
+    documents: List[AskDocument],
+) -> AskResponse:
+    """Answer ``query`` from its documents, through the answer cache."""
+
+    cache = get_answer_cache()
+    topic_ids = [document.topic_id for document in documents]
+    if cache is not None:
+        with timed_stage("answer_cache"):
+            cached = await cache.lookup(embedding, topic_ids)
+        if cached is not None:
+            return AskResponse(answer=cached.answer, documents=documents)
+
+    with timed_stage("prompt"):
+        messages = _build_messages(query, documents)
+
+    started = time.perf_counter()
     try:
-        answer = await request_ollama_chat(
-            [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ]
-        )
+        answer = await request_ollama_chat(messages)
+    except LLMOverloadedError as exc:
+        raise AnswerGenerationOverloadedError(str(exc), exc.retry_after) from exc
+    except LLMServiceError as exc:
+        raise AnswerGenerationError(str(exc)) from exc
+
+    response = AskResponse(answer=answer, documents=documents)
+
+    if cache is not None:
+        await cache.store(embedding, topic_ids, response, time.perf_counter() - started)
+
+    return response
+
+
+async def _stream_answer(
+    messages: List[Dict[str, str]],
+    on_complete: Callable[[str, float], Awaitable[None]] | None = None,
+) -> AsyncGenerator[str, None]:
+    started = time.perf_counter()
+    chunks: List[str] = []
+
+    try:
+        async for piece in stream_ollama_chat(messages):
+            chunks.append(piece)
+            yield piece
+    except LLMOverloadedError as exc:
+        raise AnswerGenerationOverloadedError(str(exc), exc.retry_after) from exc
     except LLMServiceError as exc:
         raise AnswerGenerationError(str(exc)) from exc
 
-    return AskResponse(answer=answer, documents=documents)
+    answer = "".join(chunks).strip()
+    if answer and on_complete is not None:
+        await on_complete(answer, time.perf_counter() - started)
+
+
+async def _static_answer(answer: str) -> AsyncGenerator[str, None]:
+    yield answer
+
+
+async def stream_ask(
+    request: AskRequest,
+) -> Tuple[List[AskDocument], AsyncGenerator[str, None]]:
+    """Retrieve the documents, then return them with a stream of answer pieces.
+
+    Retrieval errors are raised immediately; generation errors are raised
+    while iterating the returned stream. Identical questions already in flight
+    subscribe to the same stream, replaying the pieces produced so far; a
+    stream closed or dropped without being read releases its subscription.
+    """
+
+    if not settings.request_coalescing_enabled:
+        return await _start_stream(request)
+    return await _STREAMS_IN_FLIGHT.do(
+        _coalescing_key(request), lambda: _start_stream(request)
+    )
+
+
+async def _start_stream(
+    request: AskRequest,
+) -> Tuple[List[AskDocument], AsyncGenerator[str, None]]:
+    query, embedding, documents = await _retrieve_documents(request)
+
+    if not documents:
+        return documents, _static_answer(NO_DOCUMENT_ANSWER)
+
+    cache = get_answer_cache()
+    topic_ids = [document.topic_id for document in documents]
+    if cache is None:
+        return documents, _stream_answer(_build_messages(query, documents))
+
+    cached = await cache.lookup(embedding, topic_ids)
+    if cached is not None:
+        return documents, _static_answer(cached.answer)
+
+    async def remember(answer: str, elapsed: float) -> None:
+        response = AskResponse(answer=answer, documents=documents)
+        await cache.store(embedding, topic_ids, response, elapsed)
+
+    return documents, _stream_answer(_build_messages(query, documents), remember)
+
+
+def _batch_concurrency(request: AskBatchRequest) -> int:
+    limit = max(1, settings.ask_batch_concurrency)
+    return min(request.concurrency or limit, limit)
+
+
+async def handle_ask_batch(request: AskBatchRequest) -> AskBatchResponse:
+    """Answer every question of the batch; results are returned in request order."""
+
+    results = await stream_ask_batch(request)
+    items = [item async for item in results]
+    return AskBatchResponse(results=sorted(items, key=lambda item: item.index))
+
+
+async def stream_ask_batch(
+    request: AskBatchRequest,
+) -> AsyncGenerator[AskBatchItem, None]:
+    """Retrieve the documents of every question, then return a stream of results.
+
+    The questions are embedded in one forward pass and searched with one SQL
+    statement per retrieval leg. Generations then run at most
+    ``ASK_BATCH_CONCURRENCY`` at a time (identical questions only once) and
+    results are yielded as they complete, ``index`` giving their position.
+    Batch-wide retrieval errors are raised immediately; an empty question or
+    a failed generation only fails its own item.
+    """
+
+    max_questions = max(1, settings.ask_batch_max_questions)
+    if len(request.questions) > max_questions:
+        raise AskServiceError(f"Un lot ne peut pas dépasser {max_questions} questions.")
+
+    queries = [question.strip() for question in request.questions]
+    positions = [index for index, query in enumerate(queries) if query]
+    texts = [queries[index] for index in positions]
+
+    try:
+        with timed_stage("embedding"):
+            embeddings = await request_question_embeddings(texts)
+    except EmbeddingServiceError as exc:
+        raise RetrievalServiceError(str(exc)) from exc
+
+    try:
+        with timed_stage("retrieval"):
+            results = await retrieve_topics_batch(
+                embeddings,
+                _top_k(request),
+                texts,
+                probes=request.probes,
+                ef_search=request.ef_search,
+            )
+    except Exception as exc:  # pragma: no cover - defensive guard
+        raise RetrievalServiceError("Erreur lors de la recherche vectorielle") from exc
+
+    with timed_stage("context"):
+        prepared = {
+            index: (query, embedding, _documents_from_rows(query, rows))
+            for index, query, embedding, rows in zip(positions, texts, embeddings, results)
+        }
+
+    return _batch_results(request.questions, prepared, _batch_concurrency(request))
+
+
+async def _batch_results(
+    questions: Sequence[str],
+    prepared: Dict[int, Tuple[str, np.ndarray, List[AskDocument]]],
+    concurrency: int,
+) -> AsyncGenerator[AskBatchItem, None]:
+    semaphore = asyncio.Semaphore(concurrency)
+    generations: Dict[Hashable, asyncio.Task[AskResponse]] = {}
+
+    async def generate(
+        query: str, embedding: np.ndarray, documents: List[AskDocument]
+    ) -> AskResponse:
+        async with semaphore:
+            return await _generate_answer(query, embedding, documents)
+
+    for query, embedding, documents in prepared.values():
+        key = normalize_question(query)
+        if documents and key not in generations:
+            generations[key] = asyncio.create_task(generate(query, embedding, documents))
+
+    async def result(index: int) -> AskBatchItem:
+        query, _, documents = prepared[index]
+        if not documents:
+            return AskBatchItem(index=index, question=questions[index], answer=NO_DOCUMENT_ANSWER)
+
+        try:
+            response = await generations[normalize_question(query)]
+        except AnswerGenerationOverloadedError as exc:
+            return AskBatchItem(
+                index=index,
+                question=questions[index],
+                documents=documents,
+                status=503,
+                error=str(exc),
+                retry_after=exc.retry_after,
+            )
+        except AskServiceError as exc:
+            return AskBatchItem(
+                index=index,
+                question=questions[index],
+                documents=documents,
+                status=502,
+                error=str(exc),
+            )
+
+        return AskBatchItem(
+            index=index,
+            question=questions[index],
+            answer=response.answer,
+            documents=documents,
+        )
+
+    pending = [asyncio.ensure_future(result(index)) for index in prepared]
+    try:
+        for index, question in enumerate(questions):
+            if index not in prepared:
+                yield AskBatchItem(
+                    index=index,
+                    question=question,
+                    status=400,
+                    error="La question ne peut pas être vide.",
+                )
+        for next_result in asyncio.as_completed(pending):
+            yield await next_result
+    finally:
+        # Client gone or generator closed: stop the generations still running.
+        for task in [*pending, *generations.values()]:
+            task.cancel()
 
 
 __all__ = [
     "AskServiceError",
     "RetrievalServiceError",
     "AnswerGenerationError",
+    "AnswerGenerationOverloadedError",
     "handle_ask",
+    "handle_ask_batch",
+    "stream_ask",
+    "stream_ask_batch",
 ]
@@ -2,30 +2,108 @@
 from __future__ import annotations
 
 import json
-from typing import Iterable, Mapping
+import time
+from typing import Any, AsyncGenerator, Iterable, Mapping, Optional
 
 import httpx
+from prometheus_client import Histogram
 
 from app.config import settings
+from app.infrastructure.metrics import REGISTRY
+from app.infrastructure.ollama import (
+    OllamaBackend,
+    OllamaOverloadedError,
+    get_ollama_router,
+)
+from app.infrastructure.timing import record_stage
+
+PROMPT_CHARS = Histogram(
+    "chatbot_llm_prompt_chars",
+    "Characters sent to the LLM per generation (all messages).",
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+    registry=REGISTRY,
+)
+PROMPT_TOKENS = Histogram(
+    "chatbot_llm_prompt_tokens",
+    "Prompt tokens evaluated by Ollama per generation (prompt_eval_count).",
+    buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384),
+    registry=REGISTRY,
+)
+COMPLETION_TOKENS = Histogram(
+    "chatbot_llm_completion_tokens",
+    "Tokens generated by Ollama per generation (eval_count).",
+    buckets=(16, 32, 64, 128, 256, 512, 1024, 2048, 4096),
+    registry=REGISTRY,
+)
+TOKENS_PER_SECOND = Histogram(
+    "chatbot_llm_tokens_per_second",
+    "Ollama decoding throughput (eval_count / eval_duration).",
+    buckets=(1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 150),
+    registry=REGISTRY,
+)
+
 
 class LLMServiceError(RuntimeError):
     """Raised when the LLM service fails to generate a response."""
 
 
-async def request_ollama_chat(messages: Iterable[Mapping[str, str]]) -> str:
-    """Call the Ollama chat endpoint and return the assistant content."""
+class LLMOverloadedError(LLMServiceError):
+    """Raised when too many generations are already queued."""
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _observe_generation_stats(data: Mapping[str, Any], backend: OllamaBackend) -> None:
+    """Record the token statistics Ollama attaches to its final chunk."""
+
+    prompt_tokens = data.get("prompt_eval_count")
+    if isinstance(prompt_tokens, int):
+        PROMPT_TOKENS.observe(prompt_tokens)
+
+    eval_count = data.get("eval_count")
+    eval_duration = data.get("eval_duration")  # nanoseconds
+    if isinstance(eval_count, int):
+        COMPLETION_TOKENS.observe(eval_count)
+        if isinstance(eval_duration, int) and eval_duration > 0:
+            tokens_per_second = eval_count / (eval_duration / 1e9)
+            TOKENS_PER_SECOND.observe(tokens_per_second)
+            backend.observe_tokens_per_second(tokens_per_second)
 
-    payload = {"model": settings.ollama_model, "messages": list(messages)}
 
-    chunks: list[str] = []
+async def stream_ollama_chat(
+    messages: Iterable[Mapping[str, str]],
+    *,
+    affinity: Optional[str] = None,
+    background: bool = False,
+) -> AsyncGenerator[str, None]:
+    """Call the Ollama chat endpoint and yield content pieces as they arrive.
 
+    Closing the generator (e.g. when the HTTP client disconnects) exits the
+    upstream stream, which drops the connection and aborts the generation.
+    Calls sharing an ``affinity`` (a conversation id) go to the same backend
+    whenever it has room, so Ollama reuses the cached prompt prefix.
+    ``background`` calls fail fast with :class:`LLMOverloadedError` instead of
+    waiting for, or taking, a slot interactive callers need.
+    """
+
+    messages = list(messages)
+    payload = {
+        "model": settings.ollama_model,
+        "messages": messages,
+        "keep_alive": settings.ollama_keep_alive,
+    }
+    PROMPT_CHARS.observe(sum(len(message["content"]) for message in messages))
+
+    queued_at = time.perf_counter()
     try:
-        async with httpx.AsyncClient(timeout=settings.ollama_timeout_seconds) as client:
-            async with client.stream(
-                "POST",
-                f"{settings.ollama_base_url}/api/chat",
-                json=payload,
-            ) as response:
+        async with get_ollama_router().lease(affinity, background=background) as backend:
+            started = time.perf_counter()
+            record_stage("llm_queue", started - queued_at)
+            first_piece = True
+
+            async with backend.client.stream("POST", "/api/chat", json=payload) as response:
                 response.raise_for_status()
 
                 async for line in response.aiter_lines():
@@ -40,11 +118,18 @@ async def request_ollama_chat(messages: Iterable[Mapping[str, str]]) -> str:
                     message = data.get("message") if isinstance(data, dict) else None
                     if isinstance(message, dict):
                         content_piece = message.get("content")
-                        if isinstance(content_piece, str):
-                            chunks.append(content_piece)
+                        if isinstance(content_piece, str) and content_piece:
+                            if first_piece:
+                                first_piece = False
+                                record_stage("llm_ttft", time.perf_counter() - started)
+                            yield content_piece
 
                     if data.get("done") is True:
+                        record_stage("llm_generation", time.perf_counter() - started)
+                        _observe_generation_stats(data, backend)
                         break
+    except OllamaOverloadedError as exc:
+        raise LLMOverloadedError(str(exc), exc.retry_after) from exc
     except httpx.HTTPStatusError as exc:
         detail = exc.response.text
         raise LLMServiceError(
@@ -53,6 +138,22 @@ async def request_ollama_chat(messages: Iterable[Mapping[str, str]]) -> str:
     except httpx.HTTPError as exc:
         raise LLMServiceError("Unable to contact LLM service") from exc
 
+
+async def request_ollama_chat(
+    messages: Iterable[Mapping[str, str]],
+    *,
+    affinity: Optional[str] = None,
+    background: bool = False,
+) -> str:
+    """Call the Ollama chat endpoint and return the assistant content."""
+
+    chunks = [
+        piece
+        async for piece in stream_ollama_chat(
+            messages, affinity=affinity, background=background
+        )
+    ]
+
     content = "".join(chunks).strip()
     if not content:
         raise LLMServiceError("LLM response missing assistant content")
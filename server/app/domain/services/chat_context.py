@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+from uuid import uuid4
+
+from prometheus_client import Counter
+
+from app.config import settings
+from app.domain.services.chat import LLMOverloadedError, LLMServiceError, request_ollama_chat
+from app.domain.services.tokens import estimate_tokens
+from app.infrastructure.conversation_store import ConversationStore
+from app.infrastructure.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SUMMARIES = Counter(
+    "chatbot_chat_summaries_total",
+    "Background conversation summaries by result.",
+    ["result"],
+    registry=REGISTRY,
+)
+
+SUMMARY_PROMPT = (
+    "Vous résumez une conversation entre un utilisateur et un assistant.\n"
+    "Produisez un résumé factuel en français, en moins de {max_words} mots, qui conserve "
+    "les questions posées, les informations importantes données par l'utilisateur "
+    "(situation, contraintes, préférences) et les conclusions de l'assistant. "
+    "Intégrez le résumé précédent s'il est fourni. Répondez uniquement par le résumé."
+)
+
+SUMMARY_CONTEXT_PREFIX = "Résumé des échanges précédents de cette conversation :\n"
+
+
+def new_message(role: str, content: str) -> Dict[str, Any]:
+    """Build a stored message, counting its tokens once."""
+
+    return {
+        "id": uuid4().hex,
+        "role": role,
+        "content": content,
+        "tokens": estimate_tokens(content),
+    }
+
+
+def _tokens(message: Mapping[str, Any]) -> int:
+    tokens = message.get("tokens")
+    # Messages stored before token counting was introduced have no count.
+    return int(tokens) if tokens is not None else estimate_tokens(str(message["content"]))
+
+
+def _payload(message: Mapping[str, Any]) -> Dict[str, str]:
+    return {"role": str(message["role"]), "content": str(message["content"])}
+
+
+def _recent_window_start(history: Sequence[Mapping[str, Any]], budget: int) -> int:
+    """Return the index of the oldest message of the most recent turns fitting ``budget``."""
+
+    start = len(history)
+    used = 0
+    while start > 0 and used + _tokens(history[start - 1]) <= budget:
+        start -= 1
+        used += _tokens(history[start])
+
+    # Never open the window on an assistant reply without its question.
+    while start < len(history) and history[start]["role"] != "user":
+        start += 1
+    return start
+
+
+def _first_unsummarised(
+    history: Sequence[Mapping[str, Any]], summary: Optional[Mapping[str, Any]]
+) -> int:
+    """Index of the oldest message not folded into ``summary`` yet."""
+
+    # If the last summarised message was trimmed from the store, everything
+    # still stored is newer than it.
+    ids = [message.get("id") for message in history]
+    through = summary.get("through") if summary else None
+    return ids.index(through) + 1 if through in ids else 0
+
+
+class ChatContextManager:
+    """Bound the history sent to the LLM for each chat turn.
+
+    The most recent turns are kept verbatim within ``max_tokens``; older turns
+    are represented by a running summary, regenerated in the background (off
+    the request path) once enough unsummarised tokens have aged out. Until the
+    summary catches up, the turns that left the window without being
+    summarised are still sent verbatim (at most ``summary_min_tokens`` of them).
+    """
+
+    def __init__(
+        self,
+        store: ConversationStore,
+        max_tokens: int,
+        summary_enabled: bool,
+        summary_min_tokens: int,
+        summary_max_words: int,
+    ) -> None:
+        self.store = store
+        self.max_tokens = max(0, max_tokens)
+        self.summary_enabled = summary_enabled
+        self.summary_min_tokens = max(1, summary_min_tokens)
+        self.summary_max_words = summary_max_words
+        self._pending: Dict[str, asyncio.Task[None]] = {}
+
+    async def build_messages(
+        self,
+        conversation_id: str,
+        history: Sequence[Mapping[str, Any]],
+        user_message: Mapping[str, Any],
+    ) -> List[Dict[str, str]]:
+        """Return the LLM payload for ``user_message`` given the stored ``history``."""
+
+        summary = await self.store.load_summary(conversation_id) if history else None
+        summary_tokens = int(summary["tokens"]) if summary else 0
+
+        budget = self.max_tokens - _tokens(user_message) - summary_tokens
+        start = _recent_window_start(history, budget)
+
+        window = start
+        if self.summary_enabled and start > 0:
+            first = _first_unsummarised(history, summary)
+            if first < start:
+                # Neither in the summary nor in the window: keep the latest of
+                # them verbatim rather than dropping them until they are summarised.
+                window = first + _recent_window_start(
+                    history[first:start], self.summary_min_tokens
+                )
+            self._schedule_summary(conversation_id, history, start, summary)
+
+        messages: List[Dict[str, str]] = []
+        if summary:
+            messages.append(
+                {"role": "system", "content": SUMMARY_CONTEXT_PREFIX + str(summary["content"])}
+            )
+        messages.extend(_payload(message) for message in history[window:])
+        messages.append(_payload(user_message))
+
+        return messages
+
+    def _schedule_summary(
+        self,
+        conversation_id: str,
+        history: Sequence[Mapping[str, Any]],
+        start: int,
+        summary: Optional[Mapping[str, Any]],
+    ) -> None:
+        if conversation_id in self._pending:
+            return
+
+        first = _first_unsummarised(history, summary)
+        unsummarised = list(history[first:start])
+        if sum(_tokens(message) for message in unsummarised) < self.summary_min_tokens:
+            return
+
+        task = asyncio.create_task(self._summarise(conversation_id, summary, unsummarised))
+        self._pending[conversation_id] = task
+        task.add_done_callback(lambda _: self._pending.pop(conversation_id, None))
+
+    async def _summarise(
+        self,
+        conversation_id: str,
+        summary: Optional[Mapping[str, Any]],
+        messages: Sequence[Mapping[str, Any]],
+    ) -> None:
+        transcript = "\n".join(
+            f"{'Utilisateur' if message['role'] == 'user' else 'Assistant'} : {message['content']}"
+            for message in messages
+        )
+        if summary:
+            transcript = f"Résumé précédent :\n{summary['content']}\n\nSuite :\n{transcript}"
+
+        try:
+            content = await request_ollama_chat(
+                [
+                    {
+                        "role": "system",
+                        "content": SUMMARY_PROMPT.format(max_words=self.summary_max_words),
+                    },
+                    {"role": "user", "content": transcript},
+                ],
+                # Same host as the conversation, and only on capacity users do not need.
+                affinity=conversation_id,
+                background=True,
+            )
+            await self.store.save_summary(
+                conversation_id,
+                {
+                    "content": content,
+                    "tokens": estimate_tokens(SUMMARY_CONTEXT_PREFIX + content),
+                    "through": messages[-1].get("id"),
+                },
+            )
+        except LLMOverloadedError:
+            # Interactive traffic comes first: the next turn schedules a new attempt.
+            SUMMARIES.labels(result="deferred").inc()
+            return
+        except LLMServiceError as exc:
+            SUMMARIES.labels(result="error").inc()
+            logger.warning("Conversation summary failed for %s: %s", conversation_id, exc)
+            return
+        except Exception:  # pragma: no cover - background task must not die silently
+            SUMMARIES.labels(result="error").inc()
+            logger.exception("Conversation summary failed for %s", conversation_id)
+            return
+
+        SUMMARIES.labels(result="ok").inc()
+
+    async def close(self) -> None:
+        """Cancel summaries still running, e.g. on shutdown."""
+
+        tasks = list(self._pending.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._pending.clear()
+
+
+def create_chat_context_manager(store: ConversationStore) -> ChatContextManager:
+    """Build the context manager from the chat context and summary settings."""
+
+    return ChatContextManager(
+        store=store,
+        max_tokens=settings.chat_context_max_tokens,
+        summary_enabled=settings.chat_summary_enabled,
+        summary_min_tokens=settings.chat_summary_min_tokens,
+        summary_max_words=settings.chat_summary_max_words,
+    )
+
+
+__all__ = ["ChatContextManager", "create_chat_context_manager", "new_message"]
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+from prometheus_client import Counter, Histogram
+
+from app.config import settings
+from app.domain.services.tokens import estimate_tokens
+from app.infrastructure.metrics import REGISTRY
+
+CONTEXT_TOKENS = Histogram(
+    "chatbot_ask_context_tokens",
+    "Estimated tokens of retrieved context placed in one /ask prompt.",
+    buckets=(0, 100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000),
+    registry=REGISTRY,
+)
+PASSAGES = Counter(
+    "chatbot_ask_context_passages_total",
+    "Retrieved passages by outcome of the context assembly.",
+    ["result"],
+    registry=REGISTRY,
+)
+
+# Blank lines, and the separator placed between a topic's best chunks.
+_PASSAGE_SPLIT = re.compile(r"\n\s*\n|\n\[…\]\n")
+_WORD = re.compile(r"\w+")
+_SHINGLE_SIZE = 3
+# Similarities below this floor still get a (small) share of the budget.
+_MIN_WEIGHT = 0.05
+# Excerpt of a retrieved document without content: still cited, as before.
+UNAVAILABLE_EXCERPT = "Contenu indisponible."
+
+
+@dataclass(frozen=True)
+class ContextSource:
+    """A retrieved document before assembly."""
+
+    row: Mapping[str, object]
+    similarity: float
+
+
+@dataclass(frozen=True)
+class AssembledDocument:
+    """A retrieved document with the text actually placed in the prompt."""
+
+    row: Mapping[str, object]
+    similarity: float
+    excerpt: str
+    tokens: int
+
+
+def split_passages(content: str | None) -> List[str]:
+    if not content:
+        return []
+    return [passage.strip() for passage in _PASSAGE_SPLIT.split(content) if passage.strip()]
+
+
+def _shingles(text: str) -> Set[int]:
+    words = _WORD.findall(text.casefold())
+    if len(words) <= _SHINGLE_SIZE:
+        return {hash(tuple(words))} if words else set()
+    return {
+        hash(tuple(words[index : index + _SHINGLE_SIZE]))
+        for index in range(len(words) - _SHINGLE_SIZE + 1)
+    }
+
+
+def _duplicate_of(shingles: Set[int], kept: Sequence[Set[int]], threshold: float) -> Optional[int]:
+    """Index of the first kept passage that ``shingles`` nearly repeats, if any."""
+
+    for index, other in enumerate(kept):
+        overlap = len(shingles & other)
+        if overlap and overlap / len(shingles | other) >= threshold:
+            return index
+    return None
+
+
+def allocate_budget(sizes: Sequence[int], weights: Sequence[float], budget: int) -> List[int]:
+    """Split ``budget`` proportionally to ``weights``, capping each share at its size.
+
+    Tokens a short document does not need are redistributed to the others
+    (water-filling), so the budget is only left unused when everything fits.
+    """
+
+    allocation = [0] * len(sizes)
+    active = [index for index, size in enumerate(sizes) if size > 0]
+    remaining = max(0, budget)
+
+    while active and remaining > 0:
+        total_weight = sum(weights[index] for index in active)
+        satisfied = [
+            index
+            for index in active
+            if sizes[index] <= remaining * weights[index] / total_weight
+        ]
+        if not satisfied:
+            for index in active:
+                allocation[index] = int(remaining * weights[index] / total_weight)
+            break
+        for index in satisfied:
+            allocation[index] = sizes[index]
+            remaining -= sizes[index]
+            active.remove(index)
+
+    return allocation
+
+
+def _truncate(text: str, tokens: int) -> str:
+    limit = int(tokens * settings.llm_chars_per_token)
+    if len(text) <= limit:
+        return text
+    truncated = text[:limit].rsplit(" ", 1)[0].rstrip()
+    return f"{truncated}…"
+
+
+def _fit(passages: Sequence[str], tokens: int) -> Tuple[List[str], bool]:
+    """Keep whole passages in order while they fit, then a truncated last one.
+
+    Returns the parts placed and whether the last one was truncated.
+    """
+
+    parts: List[str] = []
+    remaining = tokens
+    for passage in passages:
+        size = estimate_tokens(passage)
+        if size <= remaining:
+            parts.append(passage)
+            remaining -= size
+            continue
+        if remaining >= settings.ask_context_min_document_tokens // 2:
+            parts.append(_truncate(passage, remaining))
+            return parts, True
+        break
+    return parts, False
+
+
+def assemble_context(
+    sources: Sequence[ContextSource],
+    budget: int,
+    dedup_threshold: Optional[float] = None,
+) -> List[AssembledDocument]:
+    """Fit the retrieved documents into ``budget`` estimated tokens.
+
+    Passages that nearly repeat one already kept (word-shingle Jaccard at or
+    above ``dedup_threshold``) are dropped, then the budget is shared across
+    documents by similarity. Documents left with nothing, or with less than
+    ``ASK_CONTEXT_MIN_DOCUMENT_TOKENS``, are dropped rather than reduced to a stub.
+    Documents without any content are kept with :data:`UNAVAILABLE_EXCERPT`.
+    A passage only suppresses its near-duplicates if it reaches the prompt:
+    when it is crowded out by the budget, the assembly is redone without it.
+    """
+
+    threshold = (
+        settings.ask_context_dedup_threshold if dedup_threshold is None else dedup_threshold
+    )
+    contents = [source.row.get("content") for source in sources]
+    passages_by_source = [
+        split_passages(content if isinstance(content, str) else None) for content in contents
+    ]
+    unavailable = sum(1 for passages in passages_by_source if not passages)
+    budget -= unavailable * estimate_tokens(UNAVAILABLE_EXCERPT)
+
+    # RETRIEVER_CONTEXT_CHAR_LIMIT still caps what any single document may take.
+    char_limit = max(200, settings.retriever_context_char_limit)
+    document_cap = int(char_limit / settings.llm_chars_per_token)
+    minimum = min(settings.ask_context_min_document_tokens, max(0, budget))
+    # (source, passage) positions crowded out while hiding a near-duplicate.
+    excluded: Set[Tuple[int, int]] = set()
+
+    while True:
+        kept: List[Set[int]] = []
+        kept_positions: List[Tuple[int, int]] = []
+        references: Set[Tuple[int, int]] = set()
+        duplicates = 0
+        candidates: List[List[Tuple[int, str]]] = []
+        for source_index, passages in enumerate(passages_by_source):
+            chosen: List[Tuple[int, str]] = []
+            for passage_index, passage in enumerate(passages):
+                if (source_index, passage_index) in excluded:
+                    continue
+                shingles = _shingles(passage)
+                original = (
+                    _duplicate_of(shingles, kept, threshold)
+                    if threshold < 1.0 and shingles
+                    else None
+                )
+                if original is not None:
+                    references.add(kept_positions[original])
+                    duplicates += 1
+                    continue
+                kept.append(shingles)
+                kept_positions.append((source_index, passage_index))
+                chosen.append((passage_index, passage))
+            candidates.append(chosen)
+
+        sizes = [
+            min(sum(estimate_tokens(passage) for _, passage in chosen), document_cap)
+            for chosen in candidates
+        ]
+        weights = [max(_MIN_WEIGHT, source.similarity) for source in sources]
+        allocation = allocate_budget(sizes, weights, budget)
+
+        fitted: Dict[int, Tuple[List[str], bool]] = {}
+        crowded_out: Set[Tuple[int, int]] = set()
+        for source_index, (chosen, size, tokens) in enumerate(
+            zip(candidates, sizes, allocation)
+        ):
+            parts: List[str] = []
+            truncated = False
+            if chosen and tokens >= min(size, minimum):
+                parts, truncated = _fit([passage for _, passage in chosen], tokens)
+            crowded_out.update(
+                (source_index, passage_index) for passage_index, _ in chosen[len(parts) :]
+            )
+            if parts:
+                fitted[source_index] = (parts, truncated)
+
+        # Each round excludes at least one more passage, so this terminates.
+        hidden = crowded_out & references
+        if not hidden:
+            break
+        excluded |= hidden
+
+    PASSAGES.labels(result="duplicate").inc(duplicates)
+    PASSAGES.labels(result="kept").inc(sum(len(chosen) for chosen in candidates))
+    PASSAGES.labels(result="truncated").inc(
+        sum(1 for _, truncated in fitted.values() if truncated)
+    )
+
+    documents: List[AssembledDocument] = []
+    for source_index, source in enumerate(sources):
+        if source_index in fitted:
+            excerpt = "\n\n".join(fitted[source_index][0])
+        elif not passages_by_source[source_index]:
+            excerpt = UNAVAILABLE_EXCERPT
+        else:
+            continue
+        documents.append(
+            AssembledDocument(
+                row=source.row,
+                similarity=source.similarity,
+                excerpt=excerpt,
+                tokens=estimate_tokens(excerpt),
+            )
+        )
+
+    CONTEXT_TOKENS.observe(sum(document.tokens for document in documents))
+    return documents
+
+
+__all__ = [
+    "AssembledDocument",
+    "ContextSource",
+    "UNAVAILABLE_EXCERPT",
+    "allocate_budget",
+    "assemble_context",
+    "split_passages",
+]
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from prometheus_client import Histogram
+
+from app.config import settings
+from app.infrastructure.metrics import REGISTRY
+from app.infrastructure.repositories.topics import (
+    query_lexical_topics,
+    query_lexical_topics_batch,
+)
+from app.infrastructure.retrievers import BatchVectorRetriever, get_vector_retriever
+
+Rows = List[Mapping[str, object]]
+
+RETRIEVED_ROWS = Histogram(
+    "chatbot_retrieval_rows",
+    "Rows returned by retrieval for one question.",
+    buckets=(0, 1, 2, 3, 5, 8, 10, 20, 50),
+    registry=REGISTRY,
+)
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Tuple[float, Rows]],
+    limit: int,
+    k: int = 60,
+) -> Rows:
+    """Merge ranked row lists with weighted reciprocal rank fusion.
+
+    Each row scores ``weight / (k + rank)`` per list it appears in. When a topic
+    appears in several lists, the row from the first list is kept (the vector
+    leg carries the best-matching chunk and the true similarity).
+    """
+
+    scores: Dict[object, float] = {}
+    rows: Dict[object, Mapping[str, object]] = {}
+
+    for weight, ranking in rankings:
+        for rank, row in enumerate(ranking, start=1):
+            topic_id = row["id"]
+            scores[topic_id] = scores.get(topic_id, 0.0) + weight / (k + rank)
+            rows.setdefault(topic_id, row)
+
+    ordered = sorted(scores, key=scores.__getitem__, reverse=True)
+    return [rows[topic_id] for topic_id in ordered[:limit]]
+
+
+async def _vector_search(
+    embedding: np.ndarray,
+    limit: int,
+    probes: Optional[int],
+    ef_search: Optional[int],
+) -> Rows:
+    retriever = get_vector_retriever()
+
+    if settings.retriever_granularity == "chunk":
+        rows = await retriever.search_chunks(
+            embedding,
+            limit,
+            chunks_per_topic=max(1, settings.retriever_chunks_per_topic),
+            candidates=limit * max(1, settings.retriever_chunk_candidates_factor),
+            probes=probes,
+            ef_search=ef_search,
+        )
+        if rows:
+            return rows
+
+    return await retriever.search_topics(embedding, limit, probes=probes, ef_search=ef_search)
+
+
+async def retrieve_topics(
+    embedding: np.ndarray,
+    limit: int,
+    query_text: str | None = None,
+    *,
+    probes: Optional[int] = None,
+    ef_search: Optional[int] = None,
+) -> Rows:
+    """Return the topics to cite, using the configured retrieval mode.
+
+    In ``chunk`` granularity each row's ``content`` is the best-matching
+    passage(s) rather than the full topic; topic-level search is used as a
+    fallback while ``topic_chunks`` has not been populated yet. In ``hybrid``
+    mode the vector and full-text searches run concurrently and are merged with
+    reciprocal rank fusion; in ``vector`` mode full-text search is only a
+    fallback when the vector search returns nothing.
+    """
+
+    if settings.retriever_mode == "hybrid" and query_text:
+        candidates = max(limit, settings.retriever_hybrid_candidates)
+        vector_rows, lexical_rows = await asyncio.gather(
+            _vector_search(embedding, candidates, probes, ef_search),
+            query_lexical_topics(query_text, candidates, embedding),
+        )
+        rows = reciprocal_rank_fusion(
+            [
+                (settings.retriever_hybrid_vector_weight, vector_rows),
+                (settings.retriever_hybrid_lexical_weight, lexical_rows),
+            ],
+            limit,
+            k=settings.retriever_rrf_k,
+        )
+    else:
+        rows = await _vector_search(embedding, limit, probes, ef_search)
+        if not rows and query_text:
+            rows = await query_lexical_topics(query_text, limit)
+
+    RETRIEVED_ROWS.observe(len(rows))
+    return rows
+
+
+async def _vector_search_batch(
+    embeddings: np.ndarray,
+    limit: int,
+    probes: Optional[int],
+    ef_search: Optional[int],
+) -> List[Rows]:
+    retriever = get_vector_retriever()
+    if not isinstance(retriever, BatchVectorRetriever):
+        return list(
+            await asyncio.gather(
+                *(_vector_search(embedding, limit, probes, ef_search) for embedding in embeddings)
+            )
+        )
+
+    results: List[Rows] = [[] for _ in embeddings]
+    if settings.retriever_granularity == "chunk":
+        results = await retriever.search_chunks_batch(
+            embeddings,
+            limit,
+            chunks_per_topic=max(1, settings.retriever_chunks_per_topic),
+            candidates=limit * max(1, settings.retriever_chunk_candidates_factor),
+            probes=probes,
+            ef_search=ef_search,
+        )
+
+    # Topic-level search for the questions chunk search left without rows.
+    missing = [index for index, rows in enumerate(results) if not rows]
+    if missing:
+        fallback = await retriever.search_topics_batch(
+            embeddings[missing],
+            limit,
+            probes=probes,
+            ef_search=ef_search,
+        )
+        for index, rows in zip(missing, fallback):
+            results[index] = rows
+
+    return results
+
+
+async def retrieve_topics_batch(
+    embeddings: np.ndarray,
+    limit: int,
+    query_texts: Sequence[str],
+    *,
+    probes: Optional[int] = None,
+    ef_search: Optional[int] = None,
+) -> List[Rows]:
+    """Batched :func:`retrieve_topics`: one row list per question, in order.
+
+    With a batch-capable retriever (PostgreSQL, or the snapshot falling back to
+    it), each search leg runs as one statement for the whole batch instead of
+    one round-trip per question.
+    """
+
+    if len(embeddings) == 0:
+        return []
+
+    if settings.retriever_mode == "hybrid":
+        candidates = max(limit, settings.retriever_hybrid_candidates)
+        vector_results, lexical_results = await asyncio.gather(
+            _vector_search_batch(embeddings, candidates, probes, ef_search),
+            query_lexical_topics_batch(query_texts, candidates, embeddings),
+        )
+        results = [
+            reciprocal_rank_fusion(
+                [
+                    (settings.retriever_hybrid_vector_weight, vector_rows),
+                    (settings.retriever_hybrid_lexical_weight, lexical_rows),
+                ],
+                limit,
+                k=settings.retriever_rrf_k,
+            )
+            for vector_rows, lexical_rows in zip(vector_results, lexical_results)
+        ]
+    else:
+        results = await _vector_search_batch(embeddings, limit, probes, ef_search)
+        missing = [index for index, rows in enumerate(results) if not rows]
+        if missing:
+            fallback = await query_lexical_topics_batch(
+                [query_texts[index] for index in missing],
+                limit,
+                embeddings[missing],
+            )
+            for index, rows in zip(missing, fallback):
+                results[index] = rows
+
+    for rows in results:
+        RETRIEVED_ROWS.observe(len(rows))
+    return results
+
+
+__all__ = ["reciprocal_rank_fusion", "retrieve_topics", "retrieve_topics_batch"]
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import math
+
+from app.config import settings
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the number of LLM tokens in ``text``.
+
+    The Ollama model tokenizer is not available in-process, so the count is
+    derived from the text length (``LLM_CHARS_PER_TOKEN``). It only needs to
+    be stable and slightly pessimistic to keep prompts within budget.
+    """
+
+    if not text:
+        return 0
+    return max(1, math.ceil(len(text) / settings.llm_chars_per_token))
+
+
+__all__ = ["estimate_tokens"]
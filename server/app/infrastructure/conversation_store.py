@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import json
+import logging
+import time
+from typing import Any, Dict, List, Mapping, Optional, Protocol, Sequence
+
+from prometheus_client import Counter, Gauge
+
+from app.config import settings
+from app.infrastructure.lru_cache import TTLCache
+from app.infrastructure.metrics import REGISTRY
+from app.infrastructure.redis_client import RedisError, get_redis
+
+logger = logging.getLogger(__name__)
+
+# Messages are ``{"role", "content"}`` dicts, possibly with bookkeeping keys
+# (identifier, cached token count) that callers strip before sending them out.
+Message = Dict[str, Any]
+
+EVICTIONS = Counter(
+    "chatbot_conversation_evictions_total",
+    "Conversations or messages dropped from the conversation store.",
+    ["reason"],
+    registry=REGISTRY,
+)
+CONVERSATIONS = Gauge(
+    "chatbot_conversation_store_conversations",
+    "Conversations held by the conversation store.",
+    ["backend"],
+    registry=REGISTRY,
+)
+STORED_BYTES = Gauge(
+    "chatbot_conversation_store_bytes",
+    "Message bytes held by the in-memory conversation store.",
+    registry=REGISTRY,
+)
+
+
+def _message_size(message: Mapping[str, Any]) -> int:
+    return len(message["role"]) + len(message["content"].encode("utf-8"))
+
+
+def _apply_caps(messages: List[Message], max_messages: int, max_bytes: int) -> List[Message]:
+    """Drop the oldest messages until both per-conversation caps hold."""
+
+    if max_messages > 0 and len(messages) > max_messages:
+        EVICTIONS.labels(reason="messages").inc(len(messages) - max_messages)
+        messages = messages[-max_messages:]
+
+    if max_bytes > 0:
+        total = sum(_message_size(message) for message in messages)
+        dropped = 0
+        # Always keep the latest message, even if it alone exceeds the budget.
+        while total > max_bytes and len(messages) - dropped > 1:
+            total -= _message_size(messages[dropped])
+            dropped += 1
+        if dropped:
+            EVICTIONS.labels(reason="bytes").inc(dropped)
+            messages = messages[dropped:]
+
+    return messages
+
+
+class ConversationStore(Protocol):
+    """Persist chat histories as ordered ``{"role", "content"}`` messages."""
+
+    async def load(self, conversation_id: str) -> List[Message]: ...
+
+    async def append(self, conversation_id: str, messages: Sequence[Message]) -> None: ...
+
+    async def load_summary(self, conversation_id: str) -> Optional[Dict[str, Any]]: ...
+
+    async def save_summary(self, conversation_id: str, summary: Mapping[str, Any]) -> None: ...
+
+
+class InMemoryConversationStore:
+    """Per-process store bounded in conversations (LRU), idle time, messages and bytes."""
+
+    def __init__(
+        self,
+        max_conversations: int,
+        max_messages: int,
+        max_bytes: int,
+        ttl: float,
+    ) -> None:
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self._conversations: TTLCache[str, List[Message]] = TTLCache(
+            max_conversations, ttl, on_remove=self._forget
+        )
+        self._summaries: TTLCache[str, Dict[str, Any]] = TTLCache(max_conversations, ttl)
+        # Bytes per conversation, kept in step with the cache so gauges stay O(1).
+        self._bytes: Dict[str, int] = {}
+        self._total_bytes = 0
+
+    def _forget(self, conversation_id: str, history: List[Message]) -> None:
+        # Called by the cache for conversations it evicted or found expired.
+        self._total_bytes -= self._bytes.pop(conversation_id, 0)
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        CONVERSATIONS.labels(backend="memory").set(len(self._conversations))
+        STORED_BYTES.set(self._total_bytes)
+
+    async def load(self, conversation_id: str) -> List[Message]:
+        return list(self._conversations.get(conversation_id) or [])
+
+    async def append(self, conversation_id: str, messages: Sequence[Message]) -> None:
+        history = (self._conversations.get(conversation_id) or []) + [
+            dict(message) for message in messages
+        ]
+        history = _apply_caps(history, self.max_messages, self.max_bytes)
+
+        size = sum(_message_size(message) for message in history)
+        self._total_bytes += size - self._bytes.get(conversation_id, 0)
+        self._bytes[conversation_id] = size
+
+        evicted = self._conversations.set(conversation_id, history)
+        if evicted:
+            EVICTIONS.labels(reason="lru").inc(evicted)
+        self._update_gauges()
+
+    async def load_summary(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        summary = self._summaries.get(conversation_id)
+        return dict(summary) if summary is not None else None
+
+    async def save_summary(self, conversation_id: str, summary: Mapping[str, Any]) -> None:
+        if self._conversations.get(conversation_id) is None:
+            # The conversation was evicted while the summary was being generated.
+            return
+        self._summaries.set(conversation_id, dict(summary))
+
+
+class RedisConversationStore:
+    """Store shared by every worker through Redis, surviving API restarts.
+
+    Each conversation is a Redis list of JSON messages with an idle TTL; a
+    sorted set of last-activity timestamps bounds the number of conversations.
+    Until Redis is reachable, the in-memory ``fallback`` is used.
+    """
+
+    KEY_PREFIX = "chatbot:conversation:"
+    SUMMARY_SUFFIX = ":summary"
+    INDEX_KEY = "chatbot:conversations"
+
+    def __init__(
+        self,
+        max_conversations: int,
+        max_messages: int,
+        max_bytes: int,
+        ttl: float,
+        fallback: InMemoryConversationStore,
+    ) -> None:
+        self.max_conversations = max_conversations
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.ttl = int(ttl) if ttl > 0 else None
+        self.fallback = fallback
+
+    async def load(self, conversation_id: str) -> List[Message]:
+        redis = get_redis()
+        if redis is None:
+            return await self.fallback.load(conversation_id)
+
+        try:
+            payloads = await redis.lrange(f"{self.KEY_PREFIX}{conversation_id}", 0, -1)
+        except RedisError as exc:
+            logger.warning("Redis unavailable, conversation history not loaded: %s", exc)
+            return await self.fallback.load(conversation_id)
+
+        return [json.loads(payload) for payload in payloads]
+
+    async def append(self, conversation_id: str, messages: Sequence[Message]) -> None:
+        redis = get_redis()
+        if redis is None:
+            await self.fallback.append(conversation_id, messages)
+            return
+
+        key = f"{self.KEY_PREFIX}{conversation_id}"
+        try:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.rpush(key, *(json.dumps(message, ensure_ascii=False) for message in messages))
+                if self.max_messages > 0:
+                    pipe.ltrim(key, -self.max_messages, -1)
+                if self.ttl:
+                    pipe.expire(key, self.ttl)
+                    pipe.expire(f"{key}{self.SUMMARY_SUFFIX}", self.ttl)
+                pipe.zadd(self.INDEX_KEY, {conversation_id: time.time()})
+                if self.ttl:
+                    pipe.zremrangebyscore(self.INDEX_KEY, "-inf", time.time() - self.ttl)
+                pipe.zcard(self.INDEX_KEY)
+                pipe.lrange(key, 0, -1)
+                *_, count, payloads = await pipe.execute()
+
+            if self.max_bytes > 0:
+                stored = [json.loads(payload) for payload in payloads]
+                kept = _apply_caps(stored, 0, self.max_bytes)
+                if len(kept) < len(stored):
+                    await redis.ltrim(key, len(stored) - len(kept), -1)
+
+            if self.max_conversations > 0 and count > self.max_conversations:
+                evicted = await redis.zpopmin(self.INDEX_KEY, count - self.max_conversations)
+                if evicted:
+                    keys = [f"{self.KEY_PREFIX}{member.decode()}" for member, _ in evicted]
+                    await redis.delete(
+                        *keys, *(f"{key}{self.SUMMARY_SUFFIX}" for key in keys)
+                    )
+                    EVICTIONS.labels(reason="lru").inc(len(evicted))
+                count = self.max_conversations
+
+            CONVERSATIONS.labels(backend="redis").set(count)
+        except RedisError as exc:
+            logger.warning("Redis unavailable, conversation kept in memory: %s", exc)
+            await self.fallback.append(conversation_id, messages)
+
+    async def load_summary(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        redis = get_redis()
+        if redis is None:
+            return await self.fallback.load_summary(conversation_id)
+
+        try:
+            payload = await redis.get(f"{self.KEY_PREFIX}{conversation_id}{self.SUMMARY_SUFFIX}")
+        except RedisError as exc:
+            logger.warning("Redis unavailable, conversation summary not loaded: %s", exc)
+            return await self.fallback.load_summary(conversation_id)
+
+        return json.loads(payload) if payload else None
+
+    async def save_summary(self, conversation_id: str, summary: Mapping[str, Any]) -> None:
+        redis = get_redis()
+        if redis is None:
+            await self.fallback.save_summary(conversation_id, summary)
+            return
+
+        try:
+            await redis.set(
+                f"{self.KEY_PREFIX}{conversation_id}{self.SUMMARY_SUFFIX}",
+                json.dumps(summary, ensure_ascii=False),
+                ex=self.ttl,
+            )
+        except RedisError as exc:
+            logger.warning("Redis unavailable, conversation summary kept in memory: %s", exc)
+            await self.fallback.save_summary(conversation_id, summary)
+
+
+def create_conversation_store() -> ConversationStore:
+    """Build the store selected by ``CONVERSATION_STORE_BACKEND``."""
+
+    memory = InMemoryConversationStore(
+        max_conversations=settings.conversation_max_conversations,
+        max_messages=settings.conversation_max_messages,
+        max_bytes=settings.conversation_max_bytes,
+        ttl=settings.conversation_ttl_seconds,
+    )
+
+    if settings.conversation_store_backend == "redis":
+        return RedisConversationStore(
+            max_conversations=settings.conversation_max_conversations,
+            max_messages=settings.conversation_max_messages,
+            max_bytes=settings.conversation_max_bytes,
+            ttl=settings.conversation_ttl_seconds,
+            fallback=memory,
+        )
+
+    return memory
+
+
+__all__ = [
+    "ConversationStore",
+    "InMemoryConversationStore",
+    "RedisConversationStore",
+    "create_conversation_store",
+]
@@ -1,24 +1,112 @@
 from __future__ import annotations
 
-from typing import Sequence
+import time
+from typing import Optional, Sequence
 
-from psycopg_pool import AsyncConnectionPool
+import numpy as np
+from prometheus_client import Counter, Gauge, Histogram
+from psycopg import AsyncConnection
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
 
 from app.config import settings
+from app.infrastructure.metrics import REGISTRY
 
 try:  # pragma: no cover - optional dependency path
-    from psycopg.types.pgvector import Vector as PgVector
-except ImportError:  # pragma: no cover - fallback when pgvector extras are missing
-    PgVector = None  # type: ignore
-
-
-_pool: AsyncConnectionPool | None = None
-
-
-def _ensure_pool() -> AsyncConnectionPool:
+    from pgvector.psycopg import register_vector_async
+except ImportError:  # pragma: no cover - fallback when pgvector is missing
+    register_vector_async = None  # type: ignore
+
+POOL_WAIT_SECONDS = Histogram(
+    "chatbot_db_pool_wait_seconds",
+    "Time spent waiting for a database connection from the pool.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+    registry=REGISTRY,
+)
+POOL_TIMEOUTS = Counter(
+    "chatbot_db_pool_timeouts_total",
+    "Connection requests that gave up after DATABASE_POOL_TIMEOUT_SECONDS.",
+    registry=REGISTRY,
+)
+POOL_CONNECTIONS = Gauge(
+    "chatbot_db_pool_connections",
+    "Connections of the database pool by state.",
+    ["state"],
+    registry=REGISTRY,
+)
+POOL_WAITING = Gauge(
+    "chatbot_db_pool_requests_waiting",
+    "Requests currently queued for a database connection.",
+    registry=REGISTRY,
+)
+
+
+class InstrumentedConnectionPool(AsyncConnectionPool):
+    """Connection pool recording how long each checkout waited."""
+
+    async def getconn(self, timeout: Optional[float] = None) -> AsyncConnection:
+        started = time.perf_counter()
+        try:
+            return await super().getconn(timeout)
+        except PoolTimeout:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+
+_pool: InstrumentedConnectionPool | None = None
+
+
+def _pool_stat(name: str) -> float:
+    if _pool is None or _pool.closed:
+        return 0.0
+    return float(_pool.get_stats().get(name, 0))
+
+
+# Read from the pool at scrape time.
+POOL_CONNECTIONS.labels(state="open").set_function(lambda: _pool_stat("pool_size"))
+POOL_CONNECTIONS.labels(state="idle").set_function(lambda: _pool_stat("pool_available"))
+POOL_CONNECTIONS.labels(state="in_use").set_function(
+    lambda: _pool_stat("pool_size") - _pool_stat("pool_available")
+)
+POOL_CONNECTIONS.labels(state="max").set_function(lambda: _pool_stat("pool_max"))
+POOL_WAITING.set_function(lambda: _pool_stat("requests_waiting"))
+
+
+async def _configure_connection(conn: AsyncConnection) -> None:
+    """Prepare a new pooled connection (run once per connection, not per checkout)."""
+
+    if register_vector_async is not None:
+        # Vectors then travel in pgvector's binary format instead of text literals.
+        await register_vector_async(conn)
+    # The type lookup may have opened a transaction; the pool expects an idle connection.
+    await conn.commit()
+
+
+def _ensure_pool() -> InstrumentedConnectionPool:
     global _pool
     if _pool is None:
-        _pool = AsyncConnectionPool(settings.database_url, open=False)
+        max_size = max(settings.database_pool_min_size, settings.database_pool_max_size)
+        _pool = InstrumentedConnectionPool(
+            settings.database_url,
+            open=False,
+            min_size=settings.database_pool_min_size,
+            max_size=max_size,
+            max_idle=settings.database_pool_max_idle_seconds,
+            max_lifetime=settings.database_pool_max_lifetime_seconds,
+            timeout=settings.database_pool_timeout_seconds,
+            check=(
+                AsyncConnectionPool.check_connection
+                if settings.database_pool_check_connections
+                else None
+            ),
+            configure=_configure_connection,
+            kwargs={
+                # ``None`` disables server-side prepared statements (e.g. PgBouncer
+                # in transaction mode); hot queries are otherwise prepared up front.
+                "prepare_threshold": 5 if settings.database_prepared_statements else None,
+            },
+        )
     return _pool
 
 
@@ -54,14 +142,28 @@ def get_pool() -> AsyncConnectionPool:
     return pool
 
 
-def to_db_vector(values: Sequence[float]) -> object:
-    """Adapt a Python sequence of floats to a format accepted by PostgreSQL."""
+def prepare_statement() -> bool | None:
+    """``prepare`` argument for hot queries: prepared on first use unless disabled."""
+
+    return True if settings.database_prepared_statements else None
+
+
+def to_db_vector(values: np.ndarray | Sequence[float]) -> object:
+    """Adapt an embedding (float32 array or sequence of floats) for PostgreSQL."""
 
-    if PgVector is not None:
-        return PgVector(values)
+    if register_vector_async is not None:
+        # Dumped by pgvector's binary dumper registered on every pooled connection.
+        return np.asarray(values, dtype=np.float32)
 
-    formatted = ", ".join(f"{value:.10f}" for value in values)
-    return f"[{formatted}]"
+    # Nine significant digits round-trip float32 exactly.
+    return "[" + ",".join(f"{value:.9g}" for value in np.asarray(values).tolist()) + "]"
 
 
-__all__ = ["init_pool", "close_pool", "get_pool", "to_db_vector"]
+__all__ = [
+    "InstrumentedConnectionPool",
+    "close_pool",
+    "get_pool",
+    "init_pool",
+    "prepare_statement",
+    "to_db_vector",
+]
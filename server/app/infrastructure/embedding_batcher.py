@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List
+
+import numpy as np
+from prometheus_client import Histogram
+
+from app.infrastructure.metrics import REGISTRY
+
+BATCH_SIZE = Histogram(
+    "chatbot_embedding_batch_size",
+    "Number of texts encoded per forward pass.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+    registry=REGISTRY,
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "chatbot_embedding_queue_wait_seconds",
+    "Time a text waited in the batcher before its batch was encoded.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+    registry=REGISTRY,
+)
+ENCODE_SECONDS = Histogram(
+    "chatbot_embedding_encode_seconds",
+    "Duration of one batched encode call.",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    registry=REGISTRY,
+)
+
+EncodeBatch = Callable[[List[str]], Awaitable[np.ndarray]]
+
+
+@dataclass
+class _PendingText:
+    text: str
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent embedding requests into batched encode calls.
+
+    The first queued text opens a window of ``max_wait_seconds``; every text
+    arriving before it closes (up to ``max_batch_size``) is encoded in the same
+    forward pass. Texts queued while a batch is encoding form the next batch.
+    """
+
+    def __init__(
+        self,
+        encode: EncodeBatch,
+        max_batch_size: int,
+        max_wait_seconds: float,
+    ) -> None:
+        self._encode = encode
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max(0.0, max_wait_seconds)
+        self._queue: asyncio.Queue[_PendingText] | None = None
+        self._worker: asyncio.Task | None = None
+
+    def _ensure_worker(self) -> asyncio.Queue[_PendingText]:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run(self._queue))
+        return self._queue
+
+    async def submit(self, text: str) -> np.ndarray:
+        """Queue ``text`` and wait for its vector (a row of the batch matrix)."""
+
+        queue = self._ensure_worker()
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        queue.put_nowait(_PendingText(text=text, future=future))
+        return await future
+
+    async def _collect(self, queue: asyncio.Queue[_PendingText]) -> List[_PendingText]:
+        batch = [await queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait_seconds
+
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Callers that gave up (cancelled request) do not need encoding.
+        return [item for item in batch if not item.future.done()]
+
+    async def _run(self, queue: asyncio.Queue[_PendingText]) -> None:
+        while True:
+            batch = await self._collect(queue)
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for item in batch:
+                QUEUE_WAIT_SECONDS.observe(started - item.enqueued_at)
+            BATCH_SIZE.observe(len(batch))
+
+            try:
+                vectors = await self._encode([item.text for item in batch])
+            except asyncio.CancelledError:
+                for item in batch:
+                    item.future.cancel()
+                raise
+            except Exception as exc:
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(exc)
+                continue
+            finally:
+                ENCODE_SECONDS.observe(time.perf_counter() - started)
+
+            for item, vector in zip(batch, vectors):
+                if not item.future.done():
+                    item.future.set_result(vector)
+
+    async def close(self) -> None:
+        """Stop the worker and fail any text still waiting."""
+
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if not item.future.done():
+                    item.future.cancel()
+            self._queue = None
+
+
+__all__ = ["EmbeddingBatcher"]
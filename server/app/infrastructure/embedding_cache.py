@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import hashlib
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+from app.config import settings
+from app.infrastructure.lru_cache import TTLCache
+from app.infrastructure.metrics import REGISTRY
+from app.infrastructure.redis_client import RedisError, get_redis
+
+CACHE_HITS = Counter(
+    "chatbot_embedding_cache_hits_total",
+    "Query embeddings served from cache.",
+    ["tier"],
+    registry=REGISTRY,
+)
+CACHE_MISSES = Counter(
+    "chatbot_embedding_cache_misses_total",
+    "Query embeddings that had to be computed.",
+    registry=REGISTRY,
+)
+CACHE_ENTRIES = Gauge(
+    "chatbot_embedding_cache_entries",
+    "Query embeddings held in the in-process cache.",
+    registry=REGISTRY,
+)
+
+
+def normalize_question(text: str) -> str:
+    """Canonical form used as cache key (Unicode, case and whitespace folded)."""
+
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def pack_vector(values: Sequence[float] | np.ndarray) -> bytes:
+    return np.ascontiguousarray(values, dtype="<f4").tobytes()
+
+
+def unpack_vector(payload: bytes) -> np.ndarray:
+    """Read-only float32 view over ``payload`` (no copy)."""
+
+    return np.frombuffer(payload, dtype="<f4")
+
+
+@lru_cache(maxsize=8)
+def _resolve_model_source(source: str) -> str:
+    # Local exports are told apart by where they live; hub ids are kept as is.
+    path = Path(source).expanduser()
+    return str(path.resolve()) if path.exists() else source
+
+
+def _model_identity() -> str:
+    identity = settings.embedding_model
+    # ONNX (and especially int8) vectors drift slightly from the torch ones.
+    if settings.embedding_backend == "onnx":
+        source = _resolve_model_source(
+            settings.embedding_onnx_model_path or settings.embedding_model
+        )
+        identity = f"{identity}@{source}/{settings.embedding_onnx_file_name}"
+    if settings.embedding_normalize:
+        identity = f"{identity}#unit"
+    return identity
+
+
+class EmbeddingCache:
+    """Two-tier cache of query embeddings: in-process LRU, then shared Redis."""
+
+    def __init__(self, max_entries: int, ttl: float, redis_ttl: int) -> None:
+        self._local: TTLCache[str, np.ndarray] = TTLCache(max_entries, ttl)
+        self._redis_ttl = redis_ttl
+        self._model_name = _model_identity()
+
+    def _key(self, text: str) -> str:
+        if _model_identity() != self._model_name:
+            # Vectors from another model are not comparable: start over.
+            self._local.clear()
+            self._model_name = _model_identity()
+
+        digest = hashlib.sha256(normalize_question(text).encode("utf-8")).hexdigest()
+        return f"chatbot:embedding:{self._model_name}:{digest}"
+
+    async def get(self, text: str) -> np.ndarray | None:
+        key = self._key(text)
+
+        vector = self._local.get(key)
+        if vector is not None:
+            CACHE_HITS.labels(tier="memory").inc()
+            return vector
+
+        redis = get_redis() if settings.embedding_cache_redis_enabled else None
+        if redis is not None:
+            try:
+                payload = await redis.get(key)
+            except RedisError:
+                payload = None
+
+            if payload:
+                vector = unpack_vector(payload)
+                self._local.set(key, vector)
+                CACHE_ENTRIES.set(len(self._local))
+                CACHE_HITS.labels(tier="redis").inc()
+                return vector
+
+        CACHE_MISSES.inc()
+        return None
+
+    async def set(self, text: str, vector: np.ndarray) -> None:
+        key = self._key(text)
+        # Own, frozen copy: ``vector`` may be a row view of a whole encoded batch,
+        # and the cached array is handed to every later request.
+        vector = np.array(vector, dtype=np.float32)
+        vector.flags.writeable = False
+        self._local.set(key, vector)
+        CACHE_ENTRIES.set(len(self._local))
+
+        redis = get_redis() if settings.embedding_cache_redis_enabled else None
+        if redis is not None:
+            try:
+                await redis.set(key, pack_vector(vector), ex=self._redis_ttl or None)
+            except RedisError:
+                pass
+
+    def clear(self) -> None:
+        self._local.clear()
+        CACHE_ENTRIES.set(0)
+
+
+_CACHE: EmbeddingCache | None = None
+
+
+def get_embedding_cache() -> EmbeddingCache | None:
+    """Return the process-wide query embedding cache, or ``None`` if disabled."""
+
+    global _CACHE
+
+    if not settings.embedding_cache_enabled:
+        return None
+
+    if _CACHE is None:
+        _CACHE = EmbeddingCache(
+            max_entries=settings.embedding_cache_max_entries,
+            ttl=settings.embedding_cache_ttl_seconds,
+            redis_ttl=settings.embedding_cache_redis_ttl_seconds,
+        )
+    return _CACHE
+
+
+__all__ = [
+    "EmbeddingCache",
+    "get_embedding_cache",
+    "normalize_question",
+    "pack_vector",
+    "unpack_vector",
+]
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import stat
+import struct
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Wire format, over a Unix stream socket; every frame is a big-endian uint32
+# length followed by the payload.
+#   request  : JSON {"id": int, "texts": [str, ...]}
+#   response : uint32 header length, JSON header {"id", "count", "dimensions",
+#              "error"}, then ``count * dimensions`` little-endian float32.
+# Requests are multiplexed by ``id`` on one connection per API worker.
+_LENGTH = struct.Struct(">I")
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+EncodeTexts = Callable[[List[str]], Awaitable[np.ndarray]]
+
+
+class EmbeddingServiceUnavailableError(RuntimeError):
+    """Raised when the shared embedding process cannot be reached or fails."""
+
+
+class EmbeddingServiceSocketInUseError(RuntimeError):
+    """Raised when the socket path is taken by a live service or is not a socket."""
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    if length > MAX_FRAME_BYTES:
+        raise EmbeddingServiceUnavailableError(f"Embedding frame too large ({length} bytes)")
+    return await reader.readexactly(length)
+
+
+def _frame(payload: bytes) -> bytes:
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def _encode_response(
+    request_id: int, vectors: np.ndarray | None, error: str | None = None
+) -> bytes:
+    matrix = np.empty((0, 0), dtype="<f4") if vectors is None else vectors
+    matrix = np.ascontiguousarray(matrix, dtype="<f4")
+    count, dimensions = matrix.shape if matrix.ndim == 2 else (0, 0)
+    header = json.dumps(
+        {"id": request_id, "count": count, "dimensions": dimensions, "error": error}
+    ).encode("utf-8")
+    return _frame(_LENGTH.pack(len(header)) + header + matrix.tobytes())
+
+
+def _decode_response(payload: bytes) -> Tuple[Mapping[str, Any], np.ndarray]:
+    """Split a response into its header and a read-only (count, dimensions) view."""
+
+    (header_length,) = _LENGTH.unpack_from(payload)
+    start = _LENGTH.size + header_length
+    header = json.loads(payload[_LENGTH.size : start])
+
+    count, dimensions = int(header["count"]), int(header["dimensions"])
+    vectors = np.frombuffer(payload, dtype="<f4", count=count * dimensions, offset=start)
+    return header, vectors.reshape(count, dimensions)
+
+
+class EmbeddingServiceClient:
+    """Client side of the shared embedding process, one connection per worker.
+
+    Concurrent calls are pipelined on the same connection and matched back by
+    request id; the connection is re-opened lazily after a failure.
+    """
+
+    def __init__(self, socket_path: str, timeout: float) -> None:
+        self.socket_path = socket_path
+        self.timeout = timeout if timeout > 0 else None
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._connect_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+
+    async def _ensure_connected(self) -> asyncio.StreamWriter:
+        async with self._connect_lock:
+            if self._writer is None or self._writer.is_closing():
+                try:
+                    reader, writer = await asyncio.open_unix_connection(self.socket_path)
+                except OSError as exc:
+                    raise EmbeddingServiceUnavailableError(
+                        f"Embedding service unreachable at {self.socket_path}: {exc}"
+                    ) from exc
+                self._writer = writer
+                self._reader_task = asyncio.create_task(self._read_responses(reader, writer))
+            return self._writer
+
+    async def _read_responses(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        error: BaseException = EmbeddingServiceUnavailableError("Embedding service disconnected")
+        try:
+            while True:
+                header, vectors = _decode_response(await _read_frame(reader))
+                future = self._pending.pop(int(header["id"]), None)
+                if future is None or future.done():
+                    continue
+                if header.get("error"):
+                    future.set_exception(EmbeddingServiceUnavailableError(header["error"]))
+                else:
+                    future.set_result(vectors)
+        except (asyncio.IncompleteReadError, OSError, ValueError) as exc:
+            error = EmbeddingServiceUnavailableError(f"Embedding service connection lost: {exc}")
+        finally:
+            writer.close()
+            if self._writer is not writer:
+                # A newer connection already took over; its requests are not ours.
+                return
+            self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        writer = await self._ensure_connected()
+
+        request_id = next(self._ids)
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+
+        payload = json.dumps({"id": request_id, "texts": texts}, ensure_ascii=False)
+        try:
+            async with self._write_lock:
+                writer.write(_frame(payload.encode("utf-8")))
+                await writer.drain()
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError as exc:
+            raise EmbeddingServiceUnavailableError("Embedding service timed out") from exc
+        except OSError as exc:
+            raise EmbeddingServiceUnavailableError(
+                f"Embedding service write failed: {exc}"
+            ) from exc
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+
+
+async def _serve_connection(
+    encode: EncodeTexts, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    write_lock = asyncio.Lock()
+    tasks: set[asyncio.Task] = set()
+
+    async def answer(request_id: int, texts: List[str]) -> None:
+        try:
+            vectors = await encode(texts)
+            response = _encode_response(request_id, vectors)
+        except Exception as exc:  # pragma: no cover - reported to the caller
+            logger.exception("Embedding request %s failed", request_id)
+            response = _encode_response(request_id, None, error=str(exc) or type(exc).__name__)
+        async with write_lock:
+            writer.write(response)
+            await writer.drain()
+
+    try:
+        while True:
+            request = json.loads(await _read_frame(reader))
+            task = asyncio.create_task(answer(int(request["id"]), list(request["texts"])))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        writer.close()
+
+
+async def _remove_stale_socket(path: Path) -> None:
+    try:
+        if not stat.S_ISSOCK(path.stat().st_mode):
+            raise EmbeddingServiceSocketInUseError(f"{path} exists and is not a socket")
+        _, writer = await asyncio.open_unix_connection(str(path))
+    except (ConnectionRefusedError, FileNotFoundError):
+        # Nobody listening: left over by a previous process, binding would fail otherwise.
+        path.unlink(missing_ok=True)
+        return
+    writer.close()
+    raise EmbeddingServiceSocketInUseError(f"An embedding service already listens on {path}")
+
+
+async def serve_embeddings(socket_path: str, encode: EncodeTexts) -> asyncio.AbstractServer:
+    """Listen on ``socket_path`` and answer every API worker with ``encode``."""
+
+    path = Path(socket_path)
+    await _remove_stale_socket(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    server = await asyncio.start_unix_server(
+        lambda reader, writer: _serve_connection(encode, reader, writer),
+        path=str(path),
+    )
+    os.chmod(path, 0o660)
+    return server
+
+
+__all__ = [
+    "EmbeddingServiceClient",
+    "EmbeddingServiceSocketInUseError",
+    "EmbeddingServiceUnavailableError",
+    "serve_embeddings",
+]
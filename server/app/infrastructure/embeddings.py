@@ -1,23 +1,54 @@
 from __future__ import annotations
 
 import asyncio
-import math
-from typing import List
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence
 
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
 from app.config import settings
+from app.infrastructure.embedding_batcher import EmbeddingBatcher
+from app.infrastructure.embedding_cache import get_embedding_cache, normalize_question
+from app.infrastructure.embedding_service import (
+    EmbeddingServiceClient,
+    EmbeddingServiceUnavailableError,
+)
+from app.infrastructure.single_flight import SingleFlight
+
+if TYPE_CHECKING:  # pragma: no cover - sentence_transformers pulls in torch
+    from sentence_transformers import SentenceTransformer
 
 
 class EmbeddingServiceError(RuntimeError):
     """Raised when the embedding service fails to generate a vector."""
 
 
-_MODEL: SentenceTransformer | None = None
+_MODEL: "SentenceTransformer | None" = None
 _MODEL_LOCK = asyncio.Lock()
+_BATCHER: EmbeddingBatcher | None = None
+_SERVICE_CLIENT: EmbeddingServiceClient | None = None
+_IN_FLIGHT: SingleFlight[np.ndarray] = SingleFlight("embedding")
+
+WARMUP_TEXT = "Quelles sont les conditions d'accès à une PMSMP ?"
+
+
+def _load_model() -> "SentenceTransformer":
+    # Imported here so routes that never embed (and forked workers) do not pay
+    # for importing torch; the import runs in a worker thread with the load.
+    if settings.embedding_backend == "onnx":
+        from app.infrastructure.onnx_embeddings import load_onnx_model
 
+        return load_onnx_model()
 
-async def _get_model() -> SentenceTransformer:
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(
+        settings.embedding_model,
+        device=settings.embedding_device,
+        trust_remote_code=settings.embedding_trust_remote_code,
+    )
+
+
+async def _get_model() -> "SentenceTransformer":
     """Return a singleton SentenceTransformer instance."""
 
     global _MODEL
@@ -26,29 +57,37 @@ async def _get_model() -> SentenceTransformer:
         async with _MODEL_LOCK:
             if _MODEL is None:
                 try:
-                    _MODEL = await asyncio.to_thread(
-                        SentenceTransformer,
-                        settings.embedding_model,
-                        device=settings.embedding_device,
-                        trust_remote_code=settings.embedding_trust_remote_code,
-                    )
+                    _MODEL = await asyncio.to_thread(_load_model)
                 except Exception as exc:  # pragma: no cover - defensive guard
                     raise EmbeddingServiceError(
-                        f"Unable to load embedding model '{settings.embedding_model}'"
+                        f"Unable to load embedding model '{settings.embedding_model}' "
+                        f"({settings.embedding_backend} backend): {exc}"
                     ) from exc
 
     return _MODEL
 
 
-async def request_embedding(text: str) -> List[float]:
-    """Request an embedding vector for the provided text."""
+def use_embedding_model(model: Any) -> None:
+    """Use an already-built model exposing ``SentenceTransformer.encode``.
+
+    Benchmarks install a deterministic stand-in this way; the batching,
+    caching and validation paths stay the same.
+    """
+
+    global _MODEL
+    _MODEL = model
+
+
+async def encode_locally(texts: List[str]) -> np.ndarray:
+    """Run a single forward pass over ``texts`` with the in-process model."""
 
     model = await _get_model()
 
     try:
-        vector = await asyncio.to_thread(
+        vectors = await asyncio.to_thread(
             model.encode,
-            text,
+            texts,
+            batch_size=max(1, len(texts)),
             show_progress_bar=False,
             convert_to_numpy=True,
             normalize_embeddings=False,
@@ -56,21 +95,169 @@ async def request_embedding(text: str) -> List[float]:
     except Exception as exc:  # pragma: no cover - defensive guard
         raise EmbeddingServiceError("Failed to compute embedding") from exc
 
-    values = vector.tolist()
+    return vectors
+
 
-    if not values:
+def _validate_embeddings(vectors: Any, count: int) -> np.ndarray:
+    """Check a whole encoded batch at once; return it as a C-contiguous float32 matrix."""
+
+    matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[1] == 0:
         raise EmbeddingServiceError("Embedding response is empty")
 
-    if not all(math.isfinite(float(value)) for value in values):
+    if matrix.shape[0] != count:
+        raise EmbeddingServiceError(
+            f"Embedding response holds {matrix.shape[0]} vectors for {count} texts"
+        )
+
+    if not np.isfinite(matrix).all():
         raise EmbeddingServiceError("Embedding contains non-finite values")
 
     expected_dim = settings.embedding_expected_dimensions
-    if expected_dim > 0 and len(values) != expected_dim:
+    if expected_dim > 0 and matrix.shape[1] != expected_dim:
         raise EmbeddingServiceError(
-            f"Embedding dimension {len(values)} does not match expected {expected_dim}"
+            f"Embedding dimension {matrix.shape[1]} does not match expected {expected_dim}"
+        )
+
+    if settings.embedding_normalize:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms > 0, norms, 1.0).astype(np.float32)
+
+    return matrix
+
+
+def _get_service_client() -> EmbeddingServiceClient:
+    global _SERVICE_CLIENT
+
+    if _SERVICE_CLIENT is None:
+        _SERVICE_CLIENT = EmbeddingServiceClient(
+            settings.embedding_service_socket,
+            timeout=settings.embedding_service_timeout_seconds,
         )
+    return _SERVICE_CLIENT
+
+
+async def _encode_batch(texts: List[str]) -> np.ndarray:
+    """Encode ``texts`` in one call, locally or through the shared embedding process."""
+
+    if not settings.embedding_service_socket:
+        return _validate_embeddings(await encode_locally(texts), len(texts))
+
+    try:
+        vectors = await _get_service_client().encode(texts)
+    except EmbeddingServiceUnavailableError as exc:
+        raise EmbeddingServiceError(str(exc)) from exc
+    return _validate_embeddings(vectors, len(texts))
+
+
+def _get_batcher() -> EmbeddingBatcher:
+    global _BATCHER
+
+    if _BATCHER is None:
+        _BATCHER = EmbeddingBatcher(
+            _encode_batch,
+            max_batch_size=settings.embedding_batch_max_size,
+            max_wait_seconds=settings.embedding_batch_max_wait_ms / 1000,
+        )
+    return _BATCHER
+
+
+async def request_embedding(text: str) -> np.ndarray:
+    """Request an embedding vector for the provided text."""
+
+    cache = get_embedding_cache()
+    if cache is not None:
+        cached = await cache.get(text)
+        if cached is not None:
+            return cached
+
+    if settings.request_coalescing_enabled:
+        # Identical questions arriving together share one encode (and cache write).
+        return await _IN_FLIGHT.do(normalize_question(text), lambda: _compute_embedding(text))
+    return await _compute_embedding(text)
+
+
+async def _compute_embedding(text: str) -> np.ndarray:
+    # Validated as part of its batch by _encode_batch.
+    if settings.embedding_batching_enabled:
+        vector = await _get_batcher().submit(text)
+    else:
+        (vector,) = await _encode_batch([text])
+
+    cache = get_embedding_cache()
+    if cache is not None:
+        await cache.set(text, vector)
+
+    return vector
+
+
+async def request_embeddings(texts: Sequence[str]) -> np.ndarray:
+    """Embed several texts in a single forward pass, one row per text in order."""
+
+    if not texts:
+        return np.empty((0, max(0, settings.embedding_expected_dimensions)), dtype=np.float32)
+
+    return await _encode_batch(list(texts))
+
+
+async def request_question_embeddings(texts: Sequence[str]) -> np.ndarray:
+    """Embed a batch of questions through the cache, one row per text in order.
+
+    Cache misses are encoded together in a single forward pass (identical
+    questions only once) and stored for later lookups.
+    """
+
+    if not texts:
+        return await request_embeddings(texts)
+
+    rows: List[np.ndarray | None] = [None] * len(texts)
+    cache = get_embedding_cache()
+    missing: Dict[str, List[int]] = {}
+
+    for index, text in enumerate(texts):
+        rows[index] = await cache.get(text) if cache is not None else None
+        if rows[index] is None:
+            missing.setdefault(normalize_question(text), []).append(index)
+
+    if missing:
+        pending = [texts[indexes[0]] for indexes in missing.values()]
+        encoded = await _encode_batch(pending)
+        for text, vector, indexes in zip(pending, encoded, missing.values()):
+            for index in indexes:
+                rows[index] = vector
+            if cache is not None:
+                await cache.set(text, vector)
+
+    return np.stack(rows)
+
+
+async def warm_up_embeddings() -> None:
+    """Load the model (or reach the embedding process) and run one encode."""
+
+    await _encode_batch([WARMUP_TEXT])
+
+
+async def close_embeddings() -> None:
+    """Stop the embedding batcher and service connection (the model stays cached)."""
+
+    global _BATCHER, _SERVICE_CLIENT
+
+    if _BATCHER is not None:
+        await _BATCHER.close()
+        _BATCHER = None
 
-    return [float(value) for value in values]
+    if _SERVICE_CLIENT is not None:
+        await _SERVICE_CLIENT.close()
+        _SERVICE_CLIENT = None
 
 
-__all__ = ["EmbeddingServiceError", "request_embedding"]
+__all__ = [
+    "EmbeddingServiceError",
+    "close_embeddings",
+    "encode_locally",
+    "request_embedding",
+    "request_embeddings",
+    "request_question_embeddings",
+    "use_embedding_model",
+    "warm_up_embeddings",
+]
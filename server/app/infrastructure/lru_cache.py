@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Size-bounded LRU mapping whose entries also expire after ``ttl`` seconds.
+
+    ``on_remove`` is called with each entry dropped by the cache itself
+    (evicted or found expired), not for explicit ``pop`` / ``clear``.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float | None,
+        on_remove: Callable[[K, V], None] | None = None,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.on_remove = on_remove
+        self._entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            if self.on_remove is not None:
+                self.on_remove(key, value)
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> int:
+        """Store ``value`` and return how many entries were evicted."""
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else float("inf")
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+
+        evicted = 0
+        while len(self._entries) > self.max_entries:
+            evicted_key, (_, evicted_value) = self._entries.popitem(last=False)
+            evicted += 1
+            if self.on_remove is not None:
+                self.on_remove(evicted_key, evicted_value)
+        return evicted
+
+    def pop(self, key: K) -> Optional[V]:
+        entry = self._entries.pop(key, None)
+        return entry[1] if entry is not None else None
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+__all__ = ["TTLCache"]
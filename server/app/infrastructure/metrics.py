@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from typing import Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest
+
+# Dedicated registry so only the application metrics are exposed on /metrics.
+REGISTRY = CollectorRegistry()
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Return the Prometheus exposition payload and its content type."""
+
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+__all__ = ["REGISTRY", "render_metrics"]
@@ -0,0 +1,518 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+import httpx
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.config import settings
+from app.infrastructure.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+BACKEND_QUEUE_DEPTH = Gauge(
+    "chatbot_ollama_backend_queue_depth",
+    "Generations sent to an Ollama backend and not finished (running or queued there).",
+    ["backend"],
+    registry=REGISTRY,
+)
+BACKEND_CAPACITY = Gauge(
+    "chatbot_ollama_backend_capacity",
+    "Concurrent generations allowed on an Ollama backend.",
+    ["backend"],
+    registry=REGISTRY,
+)
+BACKEND_HEALTHY = Gauge(
+    "chatbot_ollama_backend_healthy",
+    "Whether an Ollama backend is in rotation (1) or taken out by health checks (0).",
+    ["backend"],
+    registry=REGISTRY,
+)
+BACKEND_REQUESTS = Counter(
+    "chatbot_ollama_backend_requests_total",
+    "Generations routed to an Ollama backend, by outcome.",
+    ["backend", "result"],
+    registry=REGISTRY,
+)
+BACKEND_TOKENS_PER_SECOND = Histogram(
+    "chatbot_ollama_backend_tokens_per_second",
+    "Decoding throughput of an Ollama backend (eval_count / eval_duration).",
+    ["backend"],
+    buckets=(1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 150),
+    registry=REGISTRY,
+)
+HEALTH_CHECK_SECONDS = Histogram(
+    "chatbot_ollama_health_check_seconds",
+    "Latency of the health probe sent to each Ollama backend.",
+    ["backend"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    registry=REGISTRY,
+)
+WAITING = Gauge(
+    "chatbot_ollama_waiting_requests",
+    "Generations waiting for a free slot on any Ollama backend.",
+    registry=REGISTRY,
+)
+
+
+class OllamaOverloadedError(RuntimeError):
+    """Raised when the Ollama admission queue is full or the wait timed out."""
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _backend_name(url: str) -> str:
+    # Metric label and log name: host:port only, never credentials or paths.
+    parsed = httpx.URL(url)
+    return f"{parsed.host}:{parsed.port}" if parsed.port else parsed.host
+
+
+class OllamaBackend:
+    """One Ollama host: its HTTP clients, concurrency limit and health.
+
+    Health probes go through ``probe_client`` (defaults to ``client``) so that
+    generations saturating the main connection pool cannot starve them.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        client: httpx.AsyncClient,
+        max_in_flight: int,
+        probe_client: httpx.AsyncClient | None = None,
+    ) -> None:
+        self.url = url
+        self.name = _backend_name(url)
+        self.client = client
+        self.probe_client = probe_client or client
+        self.max_in_flight = max(1, max_in_flight)
+        self.in_flight = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+
+    @property
+    def has_capacity(self) -> bool:
+        return self.in_flight < self.max_in_flight
+
+    @property
+    def load(self) -> float:
+        return self.in_flight / self.max_in_flight
+
+    def observe_tokens_per_second(self, value: float) -> None:
+        BACKEND_TOKENS_PER_SECOND.labels(backend=self.name).observe(value)
+
+
+def _rendezvous_score(affinity: str, backend: OllamaBackend) -> float:
+    digest = hashlib.blake2b(
+        f"{affinity}\x00{backend.url}".encode("utf-8"), digest_size=8
+    ).digest()
+    unit = (int.from_bytes(digest, "big") + 1) / (2**64 + 1)
+    # Weighted rendezvous hashing: owners are spread in proportion to capacity.
+    return -backend.max_in_flight / math.log(unit)
+
+
+class OllamaRouter:
+    """Route generations across Ollama backends and bound the waiting callers.
+
+    Each generation goes to the healthy backend with the fewest outstanding
+    requests relative to its ``max_in_flight``. A generation with an affinity
+    key (a conversation id) goes to the backend owning that key by rendezvous
+    hashing, so every API worker sends a conversation to the same host and
+    Ollama reuses its prompt cache. It only spills over to another backend
+    when the owner is full. When no backend has a free slot, callers wait in
+    a FIFO queue bounded by ``max_queue`` and ``queue_timeout``: each freed
+    slot is handed to the oldest waiter, and newcomers only take a slot
+    directly while nobody is waiting. Background generations are never
+    queued: they only start when nobody waits and a slot is free, at most
+    ``max_background`` at a time.
+
+    Backends failing ``failure_threshold`` generations in a row, or their
+    periodic health probe (error or slower than the probe timeout), leave the
+    rotation until a probe succeeds again.
+    """
+
+    def __init__(
+        self,
+        backends: Sequence[OllamaBackend],
+        max_queue: int,
+        queue_timeout: float | None,
+        retry_after: int,
+        sticky: bool = True,
+        failure_threshold: int = 3,
+        health_check_interval: float = 0.0,
+        health_check_timeout: float = 2.0,
+        max_background: int = 1,
+    ) -> None:
+        if not backends:
+            raise ValueError("At least one Ollama backend is required")
+        self.backends = list(backends)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout if queue_timeout and queue_timeout > 0 else None
+        self.retry_after = max(1, retry_after)
+        self.sticky = sticky
+        self.failure_threshold = max(1, failure_threshold)
+        self.health_check_interval = max(0.0, health_check_interval)
+        self.health_check_timeout = max(0.1, health_check_timeout)
+        self.max_background = max(0, max_background)
+        self._background = 0
+        # Parked callers, oldest first, with their affinity key; each future is
+        # resolved with the backend whose slot was reserved for it.
+        self._waiters: "OrderedDict[asyncio.Future[OllamaBackend], Optional[str]]" = (
+            OrderedDict()
+        )
+        self._health_task: asyncio.Task | None = None
+
+        for backend in self.backends:
+            BACKEND_QUEUE_DEPTH.labels(backend=backend.name).set_function(
+                lambda backend=backend: backend.in_flight
+            )
+            BACKEND_CAPACITY.labels(backend=backend.name).set(backend.max_in_flight)
+            BACKEND_HEALTHY.labels(backend=backend.name).set_function(
+                lambda backend=backend: float(backend.healthy)
+            )
+        WAITING.set_function(lambda: len(self._waiters))
+
+    @property
+    def in_flight(self) -> int:
+        return sum(backend.in_flight for backend in self.backends)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _candidates(self) -> List[OllamaBackend]:
+        healthy = [backend for backend in self.backends if backend.healthy]
+        # Every host failing at once is likelier a probe problem than a full
+        # outage: keep routing rather than refuse all traffic.
+        return healthy or self.backends
+
+    def owner(self, affinity: str) -> OllamaBackend:
+        """Backend a conversation sticks to (identical in every API worker)."""
+
+        return max(self._candidates(), key=lambda backend: _rendezvous_score(affinity, backend))
+
+    def _pick(self, affinity: Optional[str]) -> Optional[OllamaBackend]:
+        candidates = self._candidates()
+        if affinity and self.sticky:
+            owner = self.owner(affinity)
+            if owner.has_capacity:
+                return owner
+
+        available = [backend for backend in candidates if backend.has_capacity]
+        if not available:
+            return None
+        return min(available, key=lambda backend: (backend.load, backend.in_flight))
+
+    def _dispatch(self) -> None:
+        """Hand free slots to the parked callers, oldest first."""
+
+        while self._waiters:
+            waiter, affinity = next(iter(self._waiters.items()))
+            if waiter.done():
+                # Cancelled or timed out: its caller removes it, skip it meanwhile.
+                del self._waiters[waiter]
+                continue
+
+            backend = self._pick(affinity)
+            if backend is None:
+                return
+
+            del self._waiters[waiter]
+            backend.in_flight += 1
+            waiter.set_result(backend)
+
+    def _release(self, backend: OllamaBackend) -> None:
+        backend.in_flight -= 1
+        self._dispatch()
+
+    async def _wait_for_backend(self, affinity: Optional[str]) -> OllamaBackend:
+        if len(self._waiters) >= self.max_queue:
+            raise OllamaOverloadedError(
+                "Le service de génération est saturé, réessayez plus tard.",
+                self.retry_after,
+            )
+
+        waiter: asyncio.Future[OllamaBackend] = asyncio.get_running_loop().create_future()
+        self._waiters[waiter] = affinity
+        try:
+            return await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError as exc:
+            self._abandon(waiter)
+            raise OllamaOverloadedError(
+                "Délai d'attente dépassé pour le service de génération.",
+                self.retry_after,
+            ) from exc
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def _abandon(self, waiter: asyncio.Future[OllamaBackend]) -> None:
+        self._waiters.pop(waiter, None)
+        # A slot reserved just as the caller gave up goes to the next waiter.
+        if waiter.done() and not waiter.cancelled():
+            self._release(waiter.result())
+
+    def _lease_background(self, affinity: Optional[str]) -> OllamaBackend:
+        backend = None
+        if not self._waiters and self._background < self.max_background:
+            backend = self._pick(affinity)
+        if backend is None:
+            raise OllamaOverloadedError(
+                "Aucune place libre pour une génération en arrière-plan.",
+                self.retry_after,
+            )
+        backend.in_flight += 1
+        self._background += 1
+        return backend
+
+    @asynccontextmanager
+    async def lease(
+        self, affinity: Optional[str] = None, *, background: bool = False
+    ) -> AsyncIterator[OllamaBackend]:
+        """Hold one generation slot on the chosen backend for the duration of the block.
+
+        A ``background`` lease is refused (``OllamaOverloadedError``) rather
+        than queued whenever it would compete with interactive callers.
+        """
+
+        if background:
+            backend = self._lease_background(affinity)
+        else:
+            backend = None if self._waiters else self._pick(affinity)
+            if backend is not None:
+                backend.in_flight += 1
+            else:
+                # Reserved for this caller by ``_dispatch``.
+                backend = await self._wait_for_backend(affinity)
+
+        try:
+            yield backend
+        except httpx.HTTPStatusError as exc:
+            BACKEND_REQUESTS.labels(backend=backend.name, result="error").inc()
+            if exc.response.status_code >= 500:
+                self._record_failure(backend, exc)
+            raise
+        except httpx.TransportError as exc:
+            BACKEND_REQUESTS.labels(backend=backend.name, result="error").inc()
+            self._record_failure(backend, exc)
+            raise
+        else:
+            BACKEND_REQUESTS.labels(backend=backend.name, result="ok").inc()
+            backend.consecutive_failures = 0
+        finally:
+            if background:
+                self._background -= 1
+            self._release(backend)
+
+    def _record_failure(self, backend: OllamaBackend, exc: BaseException) -> None:
+        backend.consecutive_failures += 1
+        # Without health probes nothing would bring the backend back.
+        if (
+            self.health_check_interval > 0
+            and backend.healthy
+            and backend.consecutive_failures >= self.failure_threshold
+        ):
+            logger.warning(
+                "Ollama backend %s out of rotation after %s failed generations: %s",
+                backend.name,
+                backend.consecutive_failures,
+                exc,
+            )
+            backend.healthy = False
+
+    def _set_health(self, backend: OllamaBackend, healthy: bool, reason: str = "") -> None:
+        if healthy:
+            backend.consecutive_failures = 0
+        if backend.healthy == healthy:
+            return
+
+        backend.healthy = healthy
+        if healthy:
+            logger.info("Ollama backend %s back in rotation", backend.name)
+            self._dispatch()
+        else:
+            logger.warning("Ollama backend %s out of rotation: %s", backend.name, reason)
+
+    async def _probe(self, backend: OllamaBackend) -> None:
+        started = time.perf_counter()
+        try:
+            response = await backend.probe_client.get(
+                "/api/version", timeout=self.health_check_timeout
+            )
+            response.raise_for_status()
+        except httpx.PoolTimeout:
+            # No free local connection says nothing about the backend itself.
+            logger.debug("Health check of Ollama backend %s skipped: pool busy", backend.name)
+        except httpx.TimeoutException:
+            self._set_health(
+                backend, False, f"health check slower than {self.health_check_timeout}s"
+            )
+        except httpx.HTTPError as exc:
+            self._set_health(backend, False, f"health check failed: {exc!r}")
+        else:
+            self._set_health(backend, True)
+        finally:
+            HEALTH_CHECK_SECONDS.labels(backend=backend.name).observe(
+                time.perf_counter() - started
+            )
+
+    async def _run_health_checks(self) -> None:
+        while True:
+            await asyncio.gather(*(self._probe(backend) for backend in self.backends))
+            await asyncio.sleep(self.health_check_interval)
+
+    def start(self) -> None:
+        """Start the periodic health probes (no-op when the interval is 0)."""
+
+        if self.health_check_interval > 0 and self._health_task is None:
+            self._health_task = asyncio.create_task(self._run_health_checks())
+
+    async def close(self) -> None:
+        """Stop the health probes and close every backend's HTTP client."""
+
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+
+        for backend in self.backends:
+            for client in {backend.client, backend.probe_client}:
+                if not client.is_closed:
+                    await client.aclose()
+
+
+_router: OllamaRouter | None = None
+
+
+def _configured_backends() -> Dict[str, int]:
+    """``OLLAMA_BACKENDS`` (url -> max in-flight, 0 = default), else ``OLLAMA_BASE_URL``.
+
+    Limits are capped at ``OLLAMA_MAX_CONNECTIONS``: a backend cannot run more
+    generations than its client has connections.
+    """
+
+    backends = settings.ollama_backends or {settings.ollama_base_url: 0}
+    pool_size = max(1, settings.ollama_max_connections)
+    configured: Dict[str, int] = {}
+    for url, limit in backends.items():
+        limit = limit if limit > 0 else settings.ollama_max_in_flight
+        if limit > pool_size:
+            logger.warning(
+                "Ollama backend %s: max in-flight %s capped at OLLAMA_MAX_CONNECTIONS=%s",
+                _backend_name(url),
+                limit,
+                pool_size,
+            )
+            limit = pool_size
+        configured[url] = limit
+    return configured
+
+
+async def init_ollama_client() -> None:
+    """Open one keep-alive HTTP client per Ollama backend and start the router."""
+
+    global _router
+    if _router is not None:
+        return
+
+    limits = httpx.Limits(
+        max_connections=settings.ollama_max_connections,
+        max_keepalive_connections=settings.ollama_max_keepalive_connections,
+        keepalive_expiry=settings.ollama_keepalive_expiry_seconds,
+    )
+    # Probes get their own single connection, never queued behind generations.
+    probe_limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+    backends = [
+        OllamaBackend(
+            url,
+            httpx.AsyncClient(
+                base_url=url, timeout=settings.ollama_timeout_seconds, limits=limits
+            ),
+            max_in_flight,
+            probe_client=httpx.AsyncClient(
+                base_url=url,
+                timeout=settings.ollama_health_check_timeout_seconds,
+                limits=probe_limits,
+            ),
+        )
+        for url, max_in_flight in _configured_backends().items()
+    ]
+    _router = OllamaRouter(
+        backends,
+        max_queue=settings.ollama_max_queue,
+        queue_timeout=settings.ollama_queue_timeout_seconds,
+        retry_after=settings.ollama_retry_after_seconds,
+        sticky=settings.ollama_sticky_conversations,
+        failure_threshold=settings.ollama_backend_failure_threshold,
+        health_check_interval=settings.ollama_health_check_interval_seconds,
+        health_check_timeout=settings.ollama_health_check_timeout_seconds,
+        max_background=settings.ollama_background_max_in_flight,
+    )
+    _router.start()
+
+
+async def close_ollama_client() -> None:
+    """Stop the router and close the pooled connections to every backend."""
+
+    global _router
+    if _router is None:
+        return
+
+    await _router.close()
+    _router = None
+
+
+def get_ollama_router() -> OllamaRouter:
+    """Return the router spreading generations over the Ollama backends."""
+
+    if _router is None:
+        raise RuntimeError("Ollama client is not open. Call init_ollama_client() first.")
+    return _router
+
+
+async def preload_ollama_model() -> None:
+    """Ask every Ollama backend to keep the chat model loaded for ``OLLAMA_KEEP_ALIVE``.
+
+    A generate request without prompt only loads the model, so the first user
+    request does not pay for it. Fails only when no backend could load it.
+    """
+
+    payload = {"model": settings.ollama_model, "keep_alive": settings.ollama_keep_alive}
+
+    async def preload(backend: OllamaBackend) -> None:
+        response = await backend.client.post("/api/generate", json=payload)
+        response.raise_for_status()
+
+    backends = get_ollama_router().backends
+    results = await asyncio.gather(
+        *(preload(backend) for backend in backends), return_exceptions=True
+    )
+    failures = [
+        (backend, result)
+        for backend, result in zip(backends, results)
+        if isinstance(result, Exception)
+    ]
+    for backend, exc in failures:
+        logger.warning("Unable to preload the model on Ollama backend %s: %s", backend.name, exc)
+    if len(failures) == len(backends):
+        raise failures[0][1]
+
+
+__all__ = [
+    "OllamaBackend",
+    "OllamaOverloadedError",
+    "OllamaRouter",
+    "close_ollama_client",
+    "get_ollama_router",
+    "init_ollama_client",
+    "preload_ollama_model",
+]
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from app.config import settings
+
+if TYPE_CHECKING:  # pragma: no cover - heavy optional imports
+    from sentence_transformers import SentenceTransformer
+
+# Quantization targets supported by ``export_dynamic_quantized_onnx_model``:
+# pick the instruction set of the production CPUs.
+QUANTIZATION_CONFIGS = ("arm64", "avx2", "avx512", "avx512_vnni")
+
+
+class OnnxEmbeddingError(RuntimeError):
+    """Raised when the ONNX embedding backend cannot be built or loaded."""
+
+
+def _session_options(threads: int) -> Any:
+    try:
+        import onnxruntime
+    except ImportError as exc:  # pragma: no cover - optional dependency path
+        raise OnnxEmbeddingError(
+            "The ONNX backend requires 'optimum[onnxruntime]' (see requirements-onnx.txt)"
+        ) from exc
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if threads > 0:
+        options.intra_op_num_threads = threads
+        # One request at a time per session call: keep inter-op parallelism off.
+        options.inter_op_num_threads = 1
+    return options
+
+
+def load_onnx_model(
+    model_path: Optional[str] = None,
+    file_name: Optional[str] = None,
+    threads: Optional[int] = None,
+) -> "SentenceTransformer":
+    """Load the embedding model on ONNX Runtime (CPU), keeping the ``encode`` API.
+
+    ``model_path`` is a directory written by :func:`export_onnx_model` (or a hub
+    id, exported on the fly); ``file_name`` selects the plain or quantized graph.
+    """
+
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(
+        model_path or settings.embedding_onnx_model_path or settings.embedding_model,
+        device="cpu",
+        backend="onnx",
+        trust_remote_code=settings.embedding_trust_remote_code,
+        model_kwargs={
+            "file_name": file_name or settings.embedding_onnx_file_name,
+            "provider": "CPUExecutionProvider",
+            "session_options": _session_options(
+                settings.embedding_onnx_threads if threads is None else threads
+            ),
+        },
+    )
+
+
+def export_onnx_model(output_dir: Path, quantization: Optional[str] = None) -> str:
+    """Export ``EMBEDDING_MODEL`` to ONNX in ``output_dir``, optionally int8-quantized.
+
+    Returns the graph file name to set as ``EMBEDDING_ONNX_FILE_NAME``.
+    """
+
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    if quantization is not None and quantization not in QUANTIZATION_CONFIGS:
+        raise OnnxEmbeddingError(
+            f"Unknown quantization '{quantization}' (expected one of {QUANTIZATION_CONFIGS})"
+        )
+
+    model = SentenceTransformer(
+        settings.embedding_model,
+        device="cpu",
+        backend="onnx",
+        trust_remote_code=settings.embedding_trust_remote_code,
+    )
+    model.save_pretrained(str(output_dir))
+
+    if quantization is None:
+        return "onnx/model.onnx"
+
+    export_dynamic_quantized_onnx_model(
+        model,
+        quantization_config=quantization,
+        model_name_or_path=str(output_dir),
+    )
+    return f"onnx/model_qint8_{quantization}.onnx"
+
+
+@dataclass
+class ParityReport:
+    texts: int
+    mean_cosine: float
+    min_cosine: float
+    max_abs_diff: float
+    reference_seconds: float
+    candidate_seconds: float
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "texts": self.texts,
+            "mean_cosine": round(self.mean_cosine, 6),
+            "min_cosine": round(self.min_cosine, 6),
+            "max_abs_diff": round(self.max_abs_diff, 6),
+            "reference_seconds": round(self.reference_seconds, 3),
+            "candidate_seconds": round(self.candidate_seconds, 3),
+            "speedup": round(self.reference_seconds / self.candidate_seconds, 2)
+            if self.candidate_seconds > 0
+            else 0.0,
+        }
+
+
+def compare_models(reference: Any, candidate: Any, texts: Sequence[str]) -> ParityReport:
+    """Encode ``texts`` with both models and measure the cosine drift between them."""
+
+    def encode(model: Any) -> tuple[Any, float]:
+        model.encode(list(texts[:1]), show_progress_bar=False)  # exclude lazy init
+        started = time.perf_counter()
+        vectors = model.encode(list(texts), show_progress_bar=False, convert_to_numpy=True)
+        return vectors, time.perf_counter() - started
+
+    expected, reference_seconds = encode(reference)
+    actual, candidate_seconds = encode(candidate)
+
+    expected = np.asarray(expected, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    dots = np.einsum("ij,ij->i", expected, actual)
+    norms = np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1)
+    cosines = np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+    return ParityReport(
+        texts=len(cosines),
+        mean_cosine=float(cosines.mean()) if len(cosines) else 0.0,
+        min_cosine=float(cosines.min()) if len(cosines) else 0.0,
+        max_abs_diff=float(np.abs(expected - actual).max()) if expected.size else 0.0,
+        reference_seconds=reference_seconds,
+        candidate_seconds=candidate_seconds,
+    )
+
+
+__all__ = [
+    "OnnxEmbeddingError",
+    "ParityReport",
+    "QUANTIZATION_CONFIGS",
+    "compare_models",
+    "export_onnx_model",
+    "load_onnx_model",
+]
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import logging
+
+from app.config import settings
+
+try:  # pragma: no cover - optional dependency path
+    from redis.asyncio import Redis
+    from redis.exceptions import RedisError
+except ImportError:  # pragma: no cover - fallback when redis is not installed
+    Redis = None  # type: ignore
+    RedisError = OSError  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+_client: "Redis | None" = None
+
+
+async def init_redis() -> None:
+    """Connect to the shared Redis instance when ``REDIS_URL`` is configured.
+
+    Redis only backs optional shared tiers, so an unreachable server is logged
+    and the application keeps running with in-process state.
+    """
+
+    global _client
+    if _client is not None or not settings.redis_url:
+        return
+
+    if Redis is None:
+        logger.warning("REDIS_URL is set but the 'redis' package is not installed")
+        return
+
+    client = Redis.from_url(settings.redis_url)
+    try:
+        await client.ping()
+    except (RedisError, OSError) as exc:
+        logger.warning("Redis unavailable at startup, shared tiers disabled: %s", exc)
+        await client.aclose()
+        return
+
+    _client = client
+
+
+async def close_redis() -> None:
+    """Close the Redis connection pool."""
+
+    global _client
+    if _client is None:
+        return
+
+    await _client.aclose()
+    _client = None
+
+
+def get_redis() -> "Redis | None":
+    """Return the shared Redis client, or ``None`` when Redis is not in use."""
+
+    return _client
+
+
+__all__ = ["RedisError", "close_redis", "get_redis", "init_redis"]
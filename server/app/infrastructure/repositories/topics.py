@@ -1,71 +1,552 @@
 from __future__ import annotations
 
-from typing import List, Mapping, Sequence
+from typing import Dict, List, Mapping, Optional, Sequence
 
+import numpy as np
 from psycopg.rows import dict_row
 
-from app.infrastructure.database import get_pool, to_db_vector
+from app.config import settings
+from app.infrastructure.database import get_pool, prepare_statement, to_db_vector
+from app.infrastructure.vector_index import VectorIndexSpec, apply_search_parameters
+
+# Cosine distance; the ANN index on topics.embedding must use the matching opclass.
+DISTANCE_OPERATOR = "<=>"
+
+TOPICS_VECTOR_INDEX = VectorIndexSpec(
+    table="topics",
+    column="embedding",
+    name="idx_topics_embedding",
+    operator=DISTANCE_OPERATOR,
+)
+CHUNKS_VECTOR_INDEX = VectorIndexSpec(
+    table="topic_chunks",
+    column="embedding",
+    name="idx_topic_chunks_embedding",
+    operator=DISTANCE_OPERATOR,
+)
+
+VECTOR_INDEXES = [TOPICS_VECTOR_INDEX, CHUNKS_VECTOR_INDEX]
+
+
+def _compact_indexes(table: str) -> Dict[str, VectorIndexSpec]:
+    return {
+        "halfvec": VectorIndexSpec(
+            table=table,
+            column="embedding_half",
+            name=f"idx_{table}_embedding_half",
+            operator="<=>",
+            column_type="halfvec",
+        ),
+        "prefix": VectorIndexSpec(
+            table=table,
+            column="embedding_prefix",
+            name=f"idx_{table}_embedding_prefix",
+            operator="<=>",
+            column_type="halfvec",
+        ),
+        "binary": VectorIndexSpec(
+            table=table,
+            column="embedding_bits",
+            name=f"idx_{table}_embedding_bits",
+            operator="<~>",
+            column_type="bit",
+        ),
+    }
+
+
+# First-stage representations (``RETRIEVER_VECTOR_STORAGE``), filled by the loader.
+COMPACT_VECTOR_INDEXES: Dict[str, Dict[str, VectorIndexSpec]] = {
+    "topics": _compact_indexes("topics"),
+    "topic_chunks": _compact_indexes("topic_chunks"),
+}
+
+# Joins the best chunks of a topic into a single excerpt.
+CHUNK_SEPARATOR = "\n[…]\n"
+
+
+def managed_vector_indexes() -> List[VectorIndexSpec]:
+    """Return the ANN indexes to build for the configured vector storage."""
+
+    storage = settings.retriever_vector_storage
+    if storage == "full":
+        return list(VECTOR_INDEXES)
+    return [COMPACT_VECTOR_INDEXES[spec.table][storage] for spec in VECTOR_INDEXES]
+
+
+def active_vector_indexes() -> List[VectorIndexSpec]:
+    """Return the indexes the configured retrieval mode actually relies on."""
+
+    indexes = managed_vector_indexes()
+    if settings.retriever_granularity == "chunk":
+        return indexes
+    return [spec for spec in indexes if spec.table == "topics"]
+
+
+def _first_stage_limit(limit: int) -> int:
+    if settings.retriever_vector_storage == "full":
+        return limit
+    return limit * max(1, settings.retriever_rerank_factor)
+
+
+def _compact_query_expression(storage: str, vector: str = "%(vector)s") -> str:
+    """The query vector in the first-stage representation, computed by PostgreSQL."""
+
+    if storage == "binary":
+        return f"binary_quantize({vector}::vector)"
+    if storage == "prefix":
+        dimensions = int(settings.retriever_prefix_dimensions)
+        return f"subvector({vector}::vector, 1, {dimensions})::halfvec"
+    return f"{vector}::halfvec"
+
+
+def _nearest_sql(
+    table: str,
+    columns: Sequence[str],
+    limit_parameter: str,
+    vector: str = "%(vector)s",
+) -> str:
+    """Select the rows of ``table`` closest to ``vector`` with their ``distance``.
+
+    ``vector`` is the SQL expression of the query vector: the ``%(vector)s``
+    parameter, or a column of the batch being searched (``LATERAL``). With a
+    compact ``RETRIEVER_VECTOR_STORAGE``, the ANN index of the compact column
+    shortlists ``%(coarse)s`` rows, re-ranked exactly on ``embedding``.
+    """
+
+    selected = ", ".join(f"r.{column}" for column in columns)
+    storage = settings.retriever_vector_storage
+
+    if storage == "full":
+        return f"""
+            SELECT {selected}, r.embedding {DISTANCE_OPERATOR} {vector} AS distance
+            FROM {table} r
+            WHERE r.embedding IS NOT NULL
+            ORDER BY r.embedding {DISTANCE_OPERATOR} {vector}
+            LIMIT %({limit_parameter})s
+        """
+
+    spec = COMPACT_VECTOR_INDEXES[table][storage]
+    return f"""
+        SELECT {selected}, r.embedding {DISTANCE_OPERATOR} {vector} AS distance
+        FROM (
+            SELECT id
+            FROM {table}
+            WHERE {spec.column} IS NOT NULL
+            ORDER BY {spec.column} {spec.operator} {_compact_query_expression(storage, vector)}
+            LIMIT %(coarse)s
+        ) AS coarse
+        JOIN {table} r USING (id)
+        WHERE r.embedding IS NOT NULL
+        ORDER BY distance
+        LIMIT %({limit_parameter})s
+    """
 
 
 async def query_similar_topics(
-    embedding: Sequence[float],
+    embedding: np.ndarray,
     limit: int,
-    query_text: str | None = None,
+    *,
+    probes: Optional[int] = None,
+    ef_search: Optional[int] = None,
 ) -> List[Mapping[str, object]]:
     """Return the closest topics to a query embedding ordered by distance."""
 
     pool = get_pool()
-    vector = to_db_vector(embedding)
+    coarse = _first_stage_limit(limit)
+    nearest = _nearest_sql("topics", ("id", "title", "subtitle", "content", "url"), "limit")
 
     async with pool.connection() as conn:
+        await apply_search_parameters(conn, limit=coarse, probes=probes, ef_search=ef_search)
+
         async with conn.cursor(row_factory=dict_row) as cursor:
             await cursor.execute(
-                """
+                f"""
+                SELECT id, title, subtitle, content, url, 1 / (1 + distance) AS similarity
+                FROM ({nearest}) AS nearest
+                ORDER BY distance
+                """,
+                {"vector": to_db_vector(embedding), "limit": limit, "coarse": coarse},
+                prepare=prepare_statement(),
+            )
+            return await cursor.fetchall()
+
+
+async def query_lexical_topics(
+    query_text: str,
+    limit: int,
+    embedding: np.ndarray | None = None,
+) -> List[Mapping[str, object]]:
+    """Return topics matching any term of ``query_text``, best full-text rank first.
+
+    Uses the stored ``search_vector`` column (GIN-indexed), so no document is
+    parsed at query time. Terms are OR-ed: ``ts_rank_cd`` favours topics that
+    match more of them, and rare exact terms (acronyms) weigh heavily. When
+    ``embedding`` is given, the cosine similarity of each hit is returned too.
+    """
+
+    pool = get_pool()
+    similarity = (
+        f"1 / (1 + (embedding {DISTANCE_OPERATOR} %(vector)s))"
+        if embedding is not None
+        else "0.0"
+    )
+
+    async with pool.connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cursor:
+            await cursor.execute(
+                f"""
+                WITH query AS (
+                    SELECT replace(plainto_tsquery('french', %(query)s)::text, '&', '|')::tsquery AS q
+                )
                 SELECT
                     id,
                     title,
                     subtitle,
                     content,
                     url,
-                    1 / (1 + (embedding <=> %s)) AS similarity
-                FROM topics
-                WHERE embedding IS NOT NULL
-                ORDER BY embedding <=> %s
-                LIMIT %s
+                    coalesce({similarity}, 0.0) AS similarity
+                FROM topics, query
+                WHERE search_vector @@ query.q
+                ORDER BY ts_rank_cd(search_vector, query.q) DESC
+                LIMIT %(limit)s
                 """,
-                (vector, vector, limit),
+                {
+                    "query": query_text,
+                    "limit": limit,
+                    "vector": to_db_vector(embedding) if embedding is not None else None,
+                },
+                prepare=prepare_statement(),
             )
-            rows = await cursor.fetchall()
+            return await cursor.fetchall()
 
-            if rows:
-                return rows
 
-            if query_text:
-                await cursor.execute(
-                    """
+async def query_similar_chunks(
+    embedding: np.ndarray,
+    limit: int,
+    *,
+    chunks_per_topic: int,
+    candidates: int,
+    probes: Optional[int] = None,
+    ef_search: Optional[int] = None,
+) -> List[Mapping[str, object]]:
+    """Return topics ranked by their best-matching chunks.
+
+    The ``candidates`` nearest chunks are grouped by topic; each topic is scored
+    by its closest chunk and ``content`` holds its ``chunks_per_topic`` best
+    chunks, in reading order.
+    """
+
+    pool = get_pool()
+    coarse = _first_stage_limit(candidates)
+    nearest = _nearest_sql(
+        "topic_chunks", ("topic_id", "chunk_index", "content"), "candidates"
+    )
+
+    async with pool.connection() as conn:
+        await apply_search_parameters(conn, limit=coarse, probes=probes, ef_search=ef_search)
+
+        async with conn.cursor(row_factory=dict_row) as cursor:
+            await cursor.execute(
+                f"""
+                WITH nearest AS ({nearest}),
+                ranked AS (
                     SELECT
-                        id,
-                        title,
-                        subtitle,
-                        content,
-                        url,
-                        0.0 AS similarity
-                    FROM topics
-                    WHERE to_tsvector(
-                        'french',
-                        coalesce(title, '') || ' ' || coalesce(subtitle, '') || ' ' || coalesce(content, '')
-                    ) @@ plainto_tsquery('french', %s)
-                    ORDER BY ts_rank_cd(
-                        to_tsvector('french', coalesce(title, '') || ' ' || coalesce(subtitle, '') || ' ' || coalesce(content, '')),
-                        plainto_tsquery('french', %s)
-                    ) DESC
-                    LIMIT %s
-                    """,
-                    (query_text, query_text, limit),
+                        *,
+                        row_number() OVER (PARTITION BY topic_id ORDER BY distance) AS position
+                    FROM nearest
+                ),
+                best AS (
+                    SELECT
+                        topic_id,
+                        min(distance) AS distance,
+                        string_agg(content, %(separator)s ORDER BY chunk_index)
+                            FILTER (WHERE position <= %(per_topic)s) AS content
+                    FROM ranked
+                    GROUP BY topic_id
                 )
-                rows = await cursor.fetchall()
+                SELECT
+                    t.id,
+                    t.title,
+                    t.subtitle,
+                    best.content,
+                    t.url,
+                    1 / (1 + best.distance) AS similarity
+                FROM best
+                JOIN topics t ON t.id = best.topic_id
+                ORDER BY best.distance
+                LIMIT %(limit)s
+                """,
+                {
+                    "vector": to_db_vector(embedding),
+                    "candidates": candidates,
+                    "coarse": coarse,
+                    "per_topic": chunks_per_topic,
+                    "separator": CHUNK_SEPARATOR,
+                    "limit": limit,
+                },
+                prepare=prepare_statement(),
+            )
+            return await cursor.fetchall()
+
+
+def _batch_vectors(embeddings: np.ndarray) -> List[object]:
+    # Bound as a single ``vector[]`` parameter, unnested into one row per query.
+    return [to_db_vector(embedding) for embedding in embeddings]
+
+
+def _group_by_position(
+    rows: Sequence[Dict[str, object]], count: int
+) -> List[List[Mapping[str, object]]]:
+    """Split the rows of a batched query by their 1-based ``position``."""
+
+    grouped: List[List[Mapping[str, object]]] = [[] for _ in range(count)]
+    for row in rows:
+        grouped[int(row.pop("position")) - 1].append(row)
+    return grouped
+
+
+async def query_similar_topics_batch(
+    embeddings: np.ndarray,
+    limit: int,
+    *,
+    probes: Optional[int] = None,
+    ef_search: Optional[int] = None,
+) -> List[List[Mapping[str, object]]]:
+    """Batched :func:`query_similar_topics`: one statement, one row list per embedding.
+
+    The query vectors are unnested and each one runs the usual index-backed
+    top-k search through ``LATERAL``.
+    """
+
+    if len(embeddings) == 0:
+        return []
+
+    pool = get_pool()
+    coarse = _first_stage_limit(limit)
+    nearest = _nearest_sql(
+        "topics", ("id", "title", "subtitle", "content", "url"), "limit", vector="q.vector"
+    )
+
+    async with pool.connection() as conn:
+        await apply_search_parameters(conn, limit=coarse, probes=probes, ef_search=ef_search)
+
+        async with conn.cursor(row_factory=dict_row) as cursor:
+            await cursor.execute(
+                f"""
+                SELECT
+                    q.position,
+                    nearest.id,
+                    nearest.title,
+                    nearest.subtitle,
+                    nearest.content,
+                    nearest.url,
+                    1 / (1 + nearest.distance) AS similarity
+                FROM unnest(%(vectors)s::vector[]) WITH ORDINALITY AS q(vector, position)
+                CROSS JOIN LATERAL ({nearest}) AS nearest
+                ORDER BY q.position, nearest.distance
+                """,
+                {"vectors": _batch_vectors(embeddings), "limit": limit, "coarse": coarse},
+                prepare=prepare_statement(),
+            )
+            return _group_by_position(await cursor.fetchall(), len(embeddings))
+
+
+async def query_lexical_topics_batch(
+    query_texts: Sequence[str],
+    limit: int,
+    embeddings: np.ndarray,
+) -> List[List[Mapping[str, object]]]:
+    """Batched :func:`query_lexical_topics` (with similarities), one row list per query."""
+
+    if len(query_texts) == 0:
+        return []
+
+    pool = get_pool()
+
+    async with pool.connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cursor:
+            await cursor.execute(
+                f"""
+                SELECT q.position, hits.id, hits.title, hits.subtitle, hits.content, hits.url,
+                       hits.similarity
+                FROM unnest(%(queries)s::text[], %(vectors)s::vector[])
+                    WITH ORDINALITY AS q(query, vector, position)
+                CROSS JOIN LATERAL (
+                    SELECT
+                        t.id,
+                        t.title,
+                        t.subtitle,
+                        t.content,
+                        t.url,
+                        coalesce(1 / (1 + (t.embedding {DISTANCE_OPERATOR} q.vector)), 0.0)
+                            AS similarity,
+                        ts_rank_cd(t.search_vector, parsed.terms) AS rank
+                    FROM topics t, (
+                        SELECT
+                            replace(plainto_tsquery('french', q.query)::text, '&', '|')::tsquery
+                                AS terms
+                    ) AS parsed
+                    WHERE t.search_vector @@ parsed.terms
+                    ORDER BY rank DESC
+                    LIMIT %(limit)s
+                ) AS hits
+                ORDER BY q.position, hits.rank DESC
+                """,
+                {
+                    "queries": list(query_texts),
+                    "vectors": _batch_vectors(embeddings),
+                    "limit": limit,
+                },
+                prepare=prepare_statement(),
+            )
+            return _group_by_position(await cursor.fetchall(), len(query_texts))
+
+
+async def query_similar_chunks_batch(
+    embeddings: np.ndarray,
+    limit: int,
+    *,
+    chunks_per_topic: int,
+    candidates: int,
+    probes: Optional[int] = None,
+    ef_search: Optional[int] = None,
+) -> List[List[Mapping[str, object]]]:
+    """Batched :func:`query_similar_chunks`: one statement, one row list per embedding."""
+
+    if len(embeddings) == 0:
+        return []
+
+    pool = get_pool()
+    coarse = _first_stage_limit(candidates)
+    nearest = _nearest_sql(
+        "topic_chunks",
+        ("topic_id", "chunk_index", "content"),
+        "candidates",
+        vector="q.vector",
+    )
+
+    async with pool.connection() as conn:
+        await apply_search_parameters(conn, limit=coarse, probes=probes, ef_search=ef_search)
+
+        async with conn.cursor(row_factory=dict_row) as cursor:
+            await cursor.execute(
+                f"""
+                SELECT
+                    q.position,
+                    t.id,
+                    t.title,
+                    t.subtitle,
+                    best.content,
+                    t.url,
+                    1 / (1 + best.distance) AS similarity
+                FROM unnest(%(vectors)s::vector[]) WITH ORDINALITY AS q(vector, position)
+                CROSS JOIN LATERAL (
+                    SELECT
+                        topic_id,
+                        min(distance) AS distance,
+                        string_agg(content, %(separator)s ORDER BY chunk_index)
+                            FILTER (WHERE chunk_rank <= %(per_topic)s) AS content
+                    FROM (
+                        SELECT
+                            *,
+                            row_number() OVER (PARTITION BY topic_id ORDER BY distance)
+                                AS chunk_rank
+                        FROM ({nearest}) AS nearest
+                    ) AS ranked
+                    GROUP BY topic_id
+                    ORDER BY min(distance)
+                    LIMIT %(limit)s
+                ) AS best
+                JOIN topics t ON t.id = best.topic_id
+                ORDER BY q.position, best.distance
+                """,
+                {
+                    "vectors": _batch_vectors(embeddings),
+                    "candidates": candidates,
+                    "coarse": coarse,
+                    "per_topic": chunks_per_topic,
+                    "separator": CHUNK_SEPARATOR,
+                    "limit": limit,
+                },
+                prepare=prepare_statement(),
+            )
+            return _group_by_position(await cursor.fetchall(), len(embeddings))
+
+
+async def fetch_topics_by_ids(topic_ids: Sequence[int]) -> List[Mapping[str, object]]:
+    """Hydrate topic rows (without embeddings) for ids found by an external index."""
+
+    if not topic_ids:
+        return []
+
+    pool = get_pool()
+
+    async with pool.connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cursor:
+            await cursor.execute(
+                """
+                SELECT id, title, subtitle, content, url
+                FROM topics
+                WHERE id = ANY(%s)
+                """,
+                (list(topic_ids),),
+            )
+            return await cursor.fetchall()
+
+
+async def fetch_chunks_by_ids(chunk_ids: Sequence[int]) -> List[Mapping[str, object]]:
+    """Hydrate chunk rows (without embeddings) for ids found by an external index."""
+
+    if not chunk_ids:
+        return []
+
+    pool = get_pool()
+
+    async with pool.connection() as conn:
+        async with conn.cursor(row_factory=dict_row) as cursor:
+            await cursor.execute(
+                """
+                SELECT id, topic_id, chunk_index, content
+                FROM topic_chunks
+                WHERE id = ANY(%s)
+                """,
+                (list(chunk_ids),),
+            )
+            return await cursor.fetchall()
+
+
+async def fetch_corpus_revision(name: str = "topics") -> int | None:
+    """Return the revision counter bumped by triggers whenever ``name`` changes."""
+
+    pool = get_pool()
+
+    async with pool.connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(
+                "SELECT revision FROM corpus_revisions WHERE name = %s",
+                (name,),
+            )
+            row = await cursor.fetchone()
 
-    return rows
+    return int(row[0]) if row else None
 
 
-__all__ = ["query_similar_topics"]
+__all__ = [
+    "CHUNK_SEPARATOR",
+    "CHUNKS_VECTOR_INDEX",
+    "COMPACT_VECTOR_INDEXES",
+    "DISTANCE_OPERATOR",
+    "TOPICS_VECTOR_INDEX",
+    "VECTOR_INDEXES",
+    "active_vector_indexes",
+    "managed_vector_indexes",
+    "fetch_chunks_by_ids",
+    "fetch_corpus_revision",
+    "fetch_topics_by_ids",
+    "query_lexical_topics",
+    "query_lexical_topics_batch",
+    "query_similar_chunks",
+    "query_similar_chunks_batch",
+    "query_similar_topics",
+    "query_similar_topics_batch",
+]
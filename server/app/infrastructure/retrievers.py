@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Mapping, Optional, Protocol, runtime_checkable
+
+import numpy as np
+from psycopg.errors import UndefinedTable
+
+from app.config import settings
+from app.infrastructure.repositories.topics import (
+    query_similar_chunks,
+    query_similar_chunks_batch,
+    query_similar_topics,
+    query_similar_topics_batch,
+)
+
+Rows = List[Mapping[str, object]]
+
+
+class VectorRetriever(Protocol):
+    """Nearest-neighbour search returning hydrated topic rows.
+
+    Rows carry ``id``, ``title``, ``subtitle``, ``content``, ``url`` and
+    ``similarity`` (``1 / (1 + cosine distance)``).
+    """
+
+    async def search_topics(
+        self,
+        embedding: np.ndarray,
+        limit: int,
+        *,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> Rows: ...
+
+    async def search_chunks(
+        self,
+        embedding: np.ndarray,
+        limit: int,
+        *,
+        chunks_per_topic: int,
+        candidates: int,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> Rows: ...
+
+
+@runtime_checkable
+class BatchVectorRetriever(VectorRetriever, Protocol):
+    """Retriever that also searches several query embeddings at once, rows in order."""
+
+    async def search_topics_batch(
+        self,
+        embeddings: np.ndarray,
+        limit: int,
+        *,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Rows]: ...
+
+    async def search_chunks_batch(
+        self,
+        embeddings: np.ndarray,
+        limit: int,
+        *,
+        chunks_per_topic: int,
+        candidates: int,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Rows]: ...
+
+
+class PostgresRetriever:
+    """ANN search inside PostgreSQL through pgvector indexes."""
+
+    async def search_topics(
+        self,
+        embedding: np.ndarray,
+        limit: int,
+        *,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> Rows:
+        return await query_similar_topics(embedding, limit, probes=probes, ef_search=ef_search)
+
+    async def search_chunks(
+        self,
+        embedding: np.ndarray,
+        limit: int,
+        *,
+        chunks_per_topic: int,
+        candidates: int,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> Rows:
+        try:
+            return await query_similar_chunks(
+                embedding,
+                limit,
+                chunks_per_topic=chunks_per_topic,
+                candidates=candidates,
+                probes=probes,
+                ef_search=ef_search,
+            )
+        except UndefinedTable:
+            # topic_chunks is created by the loader: no rows means topic search.
+            return []
+
+    async def search_topics_batch(
+        self,
+        embeddings: np.ndarray,
+        limit: int,
+        *,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Rows]:
+        return await query_similar_topics_batch(
+            embeddings, limit, probes=probes, ef_search=ef_search
+        )
+
+    async def search_chunks_batch(
+        self,
+        embeddings: np.ndarray,
+        limit: int,
+        *,
+        chunks_per_topic: int,
+        candidates: int,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Rows]:
+        try:
+            return await query_similar_chunks_batch(
+                embeddings,
+                limit,
+                chunks_per_topic=chunks_per_topic,
+                candidates=candidates,
+                probes=probes,
+                ef_search=ef_search,
+            )
+        except UndefinedTable:
+            return [[] for _ in embeddings]
+
+
+class SnapshotRetriever:
+    """Exact search over an in-process NumPy snapshot, hydrated from PostgreSQL.
+
+    Falls back to :class:`PostgresRetriever` until a snapshot is available.
+    ``probes`` / ``ef_search`` only apply to the fallback (the scan is exact).
+    """
+
+    def __init__(self, directory: Path, refresh_seconds: float, mmap: bool) -> None:
+        from app.infrastructure.snapshot_index import SnapshotVectorIndex
+
+        self.index = SnapshotVectorIndex(directory, refresh_seconds, mmap)
+        self.fallback = PostgresRetriever()
+
+    async def search_topics(
+        self,
+        embedding: np.ndarray,
+        limit: int,
+        *,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> Rows:
+        rows = await self.index.search_topics(embedding, limit)
+        if rows is None:
+            return await self.fallback.search_topics(
+                embedding, limit, probes=probes, ef_search=ef_search
+            )
+        return rows
+
+    async def search_chunks(
+        self,
+        embedding: np.ndarray,
+        limit: int,
+        *,
+        chunks_per_topic: int,
+        candidates: int,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> Rows:
+        rows = await self.index.search_chunks(
+            embedding,
+            limit,
+            chunks_per_topic=chunks_per_topic,
+            candidates=candidates,
+        )
+        if rows is None:
+            return await self.fallback.search_chunks(
+                embedding,
+                limit,
+                chunks_per_topic=chunks_per_topic,
+                candidates=candidates,
+                probes=probes,
+                ef_search=ef_search,
+            )
+        return rows
+
+    async def search_topics_batch(
+        self,
+        embeddings: np.ndarray,
+        limit: int,
+        *,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Rows]:
+        results = await self.index.search_topics_batch(embeddings, limit)
+        if results is None:
+            return await self.fallback.search_topics_batch(
+                embeddings, limit, probes=probes, ef_search=ef_search
+            )
+        return results
+
+    async def search_chunks_batch(
+        self,
+        embeddings: np.ndarray,
+        limit: int,
+        *,
+        chunks_per_topic: int,
+        candidates: int,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Rows]:
+        results = await self.index.search_chunks_batch(
+            embeddings,
+            limit,
+            chunks_per_topic=chunks_per_topic,
+            candidates=candidates,
+        )
+        if results is None:
+            return await self.fallback.search_chunks_batch(
+                embeddings,
+                limit,
+                chunks_per_topic=chunks_per_topic,
+                candidates=candidates,
+                probes=probes,
+                ef_search=ef_search,
+            )
+        return results
+
+
+_RETRIEVER: VectorRetriever | None = None
+
+
+def get_vector_retriever() -> VectorRetriever:
+    """Return the retriever selected by ``RETRIEVER_BACKEND``."""
+
+    global _RETRIEVER
+
+    if _RETRIEVER is None:
+        if settings.retriever_backend == "numpy":
+            _RETRIEVER = SnapshotRetriever(
+                Path(settings.vector_snapshot_dir),
+                refresh_seconds=settings.vector_snapshot_refresh_seconds,
+                mmap=settings.vector_snapshot_mmap,
+            )
+        else:
+            _RETRIEVER = PostgresRetriever()
+    return _RETRIEVER
+
+
+def set_vector_retriever(retriever: VectorRetriever | None) -> None:
+    """Install a specific retriever (e.g. an in-memory corpus for benchmarks).
+
+    ``None`` restores the backend selected by the settings on next use.
+    """
+
+    global _RETRIEVER
+    _RETRIEVER = retriever
+
+
+__all__ = [
+    "BatchVectorRetriever",
+    "PostgresRetriever",
+    "SnapshotRetriever",
+    "VectorRetriever",
+    "get_vector_retriever",
+    "set_vector_retriever",
+]
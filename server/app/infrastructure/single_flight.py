@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncGenerator as AsyncGeneratorABC
+from typing import (
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from prometheus_client import Counter
+
+from app.infrastructure.metrics import REGISTRY
+
+T = TypeVar("T")
+M = TypeVar("M")
+
+LEADERS = Counter(
+    "chatbot_single_flight_leaders_total",
+    "Requests that started the work shared with identical concurrent requests.",
+    ["kind"],
+    registry=REGISTRY,
+)
+COALESCED = Counter(
+    "chatbot_coalesced_requests_total",
+    "Requests served by joining an identical request already in flight.",
+    ["kind"],
+    registry=REGISTRY,
+)
+
+
+def _consume_result(task: asyncio.Future) -> None:
+    # Avoid "exception was never retrieved" when every caller went away.
+    if not task.cancelled():
+        task.exception()
+
+
+class SingleFlight(Generic[T]):
+    """Run one call per key at a time; concurrent callers await the same result.
+
+    The work runs in its own task, so a caller that is cancelled does not
+    cancel the work the other callers are waiting for.
+    """
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        self._calls: Dict[Hashable, asyncio.Task[T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            LEADERS.labels(kind=self.kind).inc()
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            COALESCED.labels(kind=self.kind).inc()
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task[T]) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        _consume_result(task)
+
+
+class SharedStream:
+    """Fan a single stream of text pieces out to any number of subscribers.
+
+    Late subscribers first replay the pieces already produced. The source is
+    closed (aborting the upstream generation) once the last subscriber leaves.
+    """
+
+    def __init__(
+        self,
+        source: AsyncGenerator[str, None],
+        on_done: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self._source = source
+        self._on_done = on_done
+        self._pieces: List[str] = []
+        self._error: BaseException | None = None
+        self._done = False
+        self._aborted = False
+        self._changed = asyncio.Condition()
+        self._subscribers = 0
+        self._task = asyncio.create_task(self._pump())
+        # A done callback also runs when the pump is cancelled before it started.
+        self._task.add_done_callback(lambda _: self._on_done() if self._on_done else None)
+
+    async def _pump(self) -> None:
+        try:
+            async for piece in self._source:
+                async with self._changed:
+                    self._pieces.append(piece)
+                    self._changed.notify_all()
+        except asyncio.CancelledError:
+            self._aborted = True
+        except Exception as exc:
+            self._error = exc
+        finally:
+            await self._source.aclose()
+            async with self._changed:
+                self._done = True
+                self._changed.notify_all()
+
+    def release_if_unused(self) -> None:
+        """Abort the source when nobody is (or is about to be) subscribed."""
+
+        if self._subscribers == 0 and not self._done:
+            self._aborted = True
+            self._task.cancel()
+
+    def subscribe(self) -> Optional[AsyncGenerator[str, None]]:
+        """Return a new stream of every piece, or ``None`` if the source was
+        already aborted because every previous subscriber left."""
+
+        if self._aborted:
+            return None
+        # Counted now rather than on first iteration, so the source is not
+        # aborted between handing out the stream and the caller reading it.
+        self._subscribers += 1
+        return _Subscription(self)
+
+    def _unsubscribe(self) -> None:
+        self._subscribers -= 1
+        self.release_if_unused()
+
+    async def _follow(self) -> AsyncGenerator[str, None]:
+        position = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: position < len(self._pieces) or self._done)
+                available = self._pieces[position:]
+                finished = self._done
+
+            for piece in available:
+                position += 1
+                yield piece
+
+            if finished and position >= len(self._pieces):
+                if self._error is not None:
+                    raise self._error
+                return
+
+
+class _Subscription(AsyncGeneratorABC):
+    """A subscriber's stream of a :class:`SharedStream`.
+
+    Unlike a bare async generator, closing it before the first iteration (or
+    dropping it unread) still unsubscribes, exactly once.
+    """
+
+    def __init__(self, shared: SharedStream) -> None:
+        self._shared = shared
+        self._pieces = shared._follow()
+        self._subscribed = True
+
+    def _unsubscribe(self) -> None:
+        if self._subscribed:
+            self._subscribed = False
+            self._shared._unsubscribe()
+
+    async def asend(self, value: Any) -> str:
+        try:
+            return await self._pieces.asend(value)
+        except BaseException:
+            # Finished, failed or cancelled: this subscriber is gone.
+            self._unsubscribe()
+            raise
+
+    async def athrow(self, *args: Any) -> str:
+        try:
+            return await self._pieces.athrow(*args)
+        except BaseException:
+            self._unsubscribe()
+            raise
+
+    async def aclose(self) -> None:
+        try:
+            await self._pieces.aclose()
+        finally:
+            self._unsubscribe()
+
+    def __del__(self) -> None:
+        # The route may never iterate (nor close) the stream, e.g. when the
+        # client disconnects before the response starts.
+        self._unsubscribe()
+
+
+class StreamSingleFlight(Generic[M]):
+    """Coalesce streamed calls: identical concurrent callers share the setup
+    result (``M``) and subscribe to the same :class:`SharedStream`.
+
+    Callers still awaiting the setup are counted, so a stream whose callers
+    all gave up before subscribing is aborted instead of generating for nobody.
+    """
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        self._flights: Dict[Hashable, asyncio.Task[Tuple[M, SharedStream]]] = {}
+        self._joiners: Dict[asyncio.Future, int] = {}
+
+    async def do(
+        self,
+        key: Hashable,
+        start: Callable[[], Awaitable[Tuple[M, AsyncGenerator[str, None]]]],
+    ) -> Tuple[M, AsyncGenerator[str, None]]:
+        flight = self._flights.get(key)
+        if flight is None:
+            LEADERS.labels(kind=self.kind).inc()
+            flight = asyncio.ensure_future(self._start(key, start))
+            self._flights[key] = flight
+            flight.add_done_callback(_consume_result)
+            flight.add_done_callback(self._release_if_abandoned)
+        else:
+            COALESCED.labels(kind=self.kind).inc()
+
+        self._joiners[flight] = self._joiners.get(flight, 0) + 1
+        try:
+            metadata, shared = await asyncio.shield(flight)
+            stream = shared.subscribe()
+        finally:
+            self._joiners[flight] -= 1
+            if not self._joiners[flight]:
+                del self._joiners[flight]
+                self._release_if_abandoned(flight)
+
+        if stream is None:
+            # Aborted by its last subscriber while we were resuming: start over.
+            return await self.do(key, start)
+        return metadata, stream
+
+    def _release_if_abandoned(self, flight: asyncio.Future) -> None:
+        if self._joiners.get(flight) or not flight.done() or flight.cancelled():
+            return
+        if flight.exception() is None:
+            _, shared = flight.result()
+            shared.release_if_unused()
+
+    async def _start(
+        self,
+        key: Hashable,
+        start: Callable[[], Awaitable[Tuple[M, AsyncGenerator[str, None]]]],
+    ) -> Tuple[M, SharedStream]:
+        flight = self._flights.get(key)
+
+        def forget() -> None:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+        try:
+            metadata, source = await start()
+        except BaseException:
+            forget()
+            raise
+        return metadata, SharedStream(source, on_done=forget)
+
+
+__all__ = ["SharedStream", "SingleFlight", "StreamSingleFlight"]
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from app.infrastructure.repositories.topics import (
+    CHUNK_SEPARATOR,
+    fetch_chunks_by_ids,
+    fetch_topics_by_ids,
+)
+
+logger = logging.getLogger(__name__)
+
+# Snapshot layout written by data/load_topics_with_embeddings.py --export-snapshot:
+#   <dir>/CURRENT            name of the active version directory
+#   <dir>/<version>/meta.json
+#   <dir>/<version>/topic_ids.npy, topic_vectors.npy
+#   <dir>/<version>/chunk_ids.npy, chunk_topic_ids.npy, chunk_vectors.npy
+# Vectors are unit-normalised float32 rows, so a dot product is the cosine similarity.
+CURRENT_FILE = "CURRENT"
+
+
+@dataclass
+class _Snapshot:
+    version: str
+    topic_ids: np.ndarray
+    topic_vectors: np.ndarray
+    chunk_ids: np.ndarray
+    chunk_topic_ids: np.ndarray
+    chunk_vectors: np.ndarray
+
+
+def _load_snapshot(directory: Path, version: str, mmap: bool) -> _Snapshot:
+    root = directory / version
+    mode = "r" if mmap else None
+
+    def load(name: str, dtype: type) -> np.ndarray:
+        path = root / f"{name}.npy"
+        if not path.exists():
+            return np.empty((0,), dtype=dtype)
+        return np.load(path, mmap_mode=mode)
+
+    meta = json.loads((root / "meta.json").read_text(encoding="utf-8"))
+
+    snapshot = _Snapshot(
+        version=version,
+        topic_ids=load("topic_ids", np.int64),
+        topic_vectors=load("topic_vectors", np.float32),
+        chunk_ids=load("chunk_ids", np.int64),
+        chunk_topic_ids=load("chunk_topic_ids", np.int64),
+        chunk_vectors=load("chunk_vectors", np.float32),
+    )
+
+    for ids, vectors in (
+        (snapshot.topic_ids, snapshot.topic_vectors),
+        (snapshot.chunk_ids, snapshot.chunk_vectors),
+    ):
+        if len(ids) != len(vectors) or (
+            len(vectors) and vectors.shape[1] != int(meta.get("dimensions", vectors.shape[1]))
+        ):
+            raise ValueError(f"Inconsistent vector snapshot '{version}'")
+
+    return snapshot
+
+
+def _top_k(
+    matrix: np.ndarray, queries: np.ndarray, k: int
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Return, per query row, the indices and cosine similarities of the ``k`` best rows."""
+
+    scores = queries @ matrix.T
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = (np.empty((0,), dtype=np.int64), np.empty((0,), dtype=np.float32))
+        return [empty for _ in range(len(queries))]
+
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    top = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-top, axis=1)
+    return list(
+        zip(np.take_along_axis(candidates, order, axis=1), np.take_along_axis(top, order, axis=1))
+    )
+
+
+def _best_chunks(
+    snapshot: _Snapshot,
+    queries: np.ndarray,
+    limit: int,
+    chunks_per_topic: int,
+    candidates: int,
+) -> List[Tuple[List[int], Dict[int, float], List[int]]]:
+    """Per query: topics ranked by their best chunk, their scores and the chunks to show."""
+
+    results = []
+    for indices, scores in _top_k(snapshot.chunk_vectors, queries, candidates):
+        best: Dict[int, float] = {}
+        selected: Dict[int, List[int]] = {}
+        for index, score in zip(indices, scores):
+            topic_id = int(snapshot.chunk_topic_ids[index])
+            best.setdefault(topic_id, float(score))
+            chunks = selected.setdefault(topic_id, [])
+            if len(chunks) < chunks_per_topic:
+                chunks.append(int(snapshot.chunk_ids[index]))
+
+        ranked = sorted(best, key=best.__getitem__, reverse=True)[:limit]
+        chunk_ids = [chunk_id for topic_id in ranked for chunk_id in selected[topic_id]]
+        results.append((ranked, best, chunk_ids))
+    return results
+
+
+def _similarity(cosine: float) -> float:
+    # Same scale as the SQL queries: 1 / (1 + cosine distance).
+    return 1.0 / (1.0 + (1.0 - cosine))
+
+
+class SnapshotVectorIndex:
+    """Exact in-process top-k over a (memory-mapped) snapshot of the embeddings.
+
+    A batch of searches is one matrix product plus ``argpartition``, run off the
+    event loop; PostgreSQL is only hit to hydrate the selected rows. The ``CURRENT`` pointer is re-read at
+    most every ``refresh_seconds`` so a new export is picked up without restart.
+    """
+
+    def __init__(self, directory: Path, refresh_seconds: float, mmap: bool) -> None:
+        self.directory = directory
+        self.refresh_seconds = max(0.0, refresh_seconds)
+        self.mmap = mmap
+        self._snapshot: Optional[_Snapshot] = None
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._snapshot.version if self._snapshot else None
+
+    async def refresh(self, force: bool = False) -> Optional[_Snapshot]:
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_seconds:
+            return self._snapshot
+
+        async with self._lock:
+            if not force and now - self._checked_at < self.refresh_seconds:
+                return self._snapshot
+            self._checked_at = now
+
+            try:
+                version = (self.directory / CURRENT_FILE).read_text(encoding="utf-8").strip()
+            except OSError:
+                version = ""
+
+            if not version or (self._snapshot and self._snapshot.version == version):
+                return self._snapshot
+
+            try:
+                self._snapshot = await asyncio.to_thread(
+                    _load_snapshot, self.directory, version, self.mmap
+                )
+                logger.info("Loaded vector snapshot %s", version)
+            except (OSError, ValueError) as exc:
+                logger.warning("Unable to load vector snapshot %s: %s", version, exc)
+
+        return self._snapshot
+
+    async def search_topics(
+        self, embedding: np.ndarray, limit: int
+    ) -> Optional[List[Mapping[str, object]]]:
+        """Return the top topics, or ``None`` when no snapshot is available."""
+
+        results = await self.search_topics_batch(embedding[np.newaxis], limit)
+        return None if results is None else results[0]
+
+    async def search_topics_batch(
+        self, embeddings: np.ndarray, limit: int
+    ) -> Optional[List[List[Mapping[str, object]]]]:
+        """Batched :meth:`search_topics`: one matrix product and one hydration query."""
+
+        snapshot = await self.refresh()
+        if snapshot is None or len(snapshot.topic_ids) == 0:
+            return None
+
+        queries = _normalise(embeddings)
+        ranked = [
+            [(int(snapshot.topic_ids[index]), float(score)) for index, score in zip(*best)]
+            for best in await asyncio.to_thread(_top_k, snapshot.topic_vectors, queries, limit)
+        ]
+
+        topic_ids = list(dict.fromkeys(topic_id for hits in ranked for topic_id, _ in hits))
+        rows = {row["id"]: row for row in await fetch_topics_by_ids(topic_ids)}
+        return [
+            [
+                {**rows[topic_id], "similarity": _similarity(score)}
+                for topic_id, score in hits
+                if topic_id in rows
+            ]
+            for hits in ranked
+        ]
+
+    async def search_chunks(
+        self,
+        embedding: np.ndarray,
+        limit: int,
+        *,
+        chunks_per_topic: int,
+        candidates: int,
+    ) -> Optional[List[Mapping[str, object]]]:
+        """Return topics ranked by their best chunks, or ``None`` without snapshot."""
+
+        results = await self.search_chunks_batch(
+            embedding[np.newaxis], limit, chunks_per_topic=chunks_per_topic, candidates=candidates
+        )
+        return None if results is None else results[0]
+
+    async def search_chunks_batch(
+        self,
+        embeddings: np.ndarray,
+        limit: int,
+        *,
+        chunks_per_topic: int,
+        candidates: int,
+    ) -> Optional[List[List[Mapping[str, object]]]]:
+        """Batched :meth:`search_chunks`: one matrix product and one hydration per table."""
+
+        snapshot = await self.refresh()
+        if snapshot is None or len(snapshot.chunk_ids) == 0:
+            return None
+
+        ranked = await asyncio.to_thread(
+            _best_chunks,
+            snapshot,
+            _normalise(embeddings),
+            limit,
+            chunks_per_topic,
+            candidates,
+        )
+
+        topic_ids = list(dict.fromkeys(topic_id for topics, _, _ in ranked for topic_id in topics))
+        chunk_ids = list(dict.fromkeys(chunk_id for *_, chunks in ranked for chunk_id in chunks))
+        topics, chunks = await asyncio.gather(
+            fetch_topics_by_ids(topic_ids),
+            fetch_chunks_by_ids(chunk_ids),
+        )
+        topic_rows = {row["id"]: row for row in topics}
+        chunk_rows = {int(chunk["id"]): chunk for chunk in chunks}
+
+        results: List[List[Mapping[str, object]]] = []
+        for topic_order, best, selected in ranked:
+            passages_by_topic: Dict[int, List[Mapping[str, object]]] = {}
+            for chunk_id in selected:
+                if chunk_id in chunk_rows:
+                    chunk = chunk_rows[chunk_id]
+                    passages_by_topic.setdefault(int(chunk["topic_id"]), []).append(chunk)
+
+            rows: List[Mapping[str, object]] = []
+            for topic_id in topic_order:
+                if topic_id not in topic_rows:
+                    continue
+                passages = sorted(
+                    passages_by_topic.get(topic_id, []), key=lambda chunk: chunk["chunk_index"]
+                )
+                rows.append(
+                    {
+                        **topic_rows[topic_id],
+                        "content": CHUNK_SEPARATOR.join(str(chunk["content"]) for chunk in passages)
+                        or topic_rows[topic_id].get("content"),
+                        "similarity": _similarity(best[topic_id]),
+                    }
+                )
+            results.append(rows)
+        return results
+
+
+def _normalise(embeddings: np.ndarray) -> np.ndarray:
+    queries = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(queries, axis=1, keepdims=True)
+    return np.divide(queries, norms, out=np.zeros_like(queries), where=norms > 0)
+
+
+__all__ = ["CURRENT_FILE", "SnapshotVectorIndex"]
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator
+
+from prometheus_client import Histogram
+
+from app.infrastructure.metrics import REGISTRY
+
+STAGE_SECONDS = Histogram(
+    "chatbot_stage_seconds",
+    "Time spent in each stage of a request (embedding, retrieval, LLM, ...).",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+    registry=REGISTRY,
+)
+
+
+class ServerTiming:
+    """Stage durations of one request, rendered as a ``Server-Timing`` header."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self._durations: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self._durations[stage] = self._durations.get(stage, 0.0) + seconds
+
+    def durations(self) -> Dict[str, float]:
+        """Return the seconds spent per stage, plus ``total`` since creation."""
+
+        entries = dict(self._durations)
+        entries["total"] = time.perf_counter() - self.started
+        return entries
+
+    def header(self) -> str:
+        entries = self.durations()
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in entries.items())
+
+
+_current: ContextVar[ServerTiming | None] = ContextVar("server_timing", default=None)
+
+
+@contextmanager
+def collect_server_timing() -> Iterator[ServerTiming]:
+    """Collect the stages recorded while the block runs (tasks it spawns included)."""
+
+    timing = ServerTiming()
+    token = _current.set(timing)
+    try:
+        yield timing
+    finally:
+        _current.reset(token)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Observe a stage duration and add it to the current request's Server-Timing."""
+
+    STAGE_SECONDS.labels(stage=stage).observe(seconds)
+    timing = _current.get()
+    if timing is not None:
+        timing.add(stage, seconds)
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+__all__ = [
+    "STAGE_SECONDS",
+    "ServerTiming",
+    "collect_server_timing",
+    "record_stage",
+    "timed_stage",
+]
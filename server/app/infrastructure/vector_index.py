@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from psycopg import AsyncConnection, sql
+
+from app.config import settings
+from app.infrastructure.database import prepare_statement
+
+
+class VectorIndexError(RuntimeError):
+    """Raised when the ANN index cannot serve the retrieval queries."""
+
+
+# pgvector operator -> operator class the index must be built with to serve it.
+OPERATOR_OPCLASSES: Dict[str, str] = {
+    "<->": "vector_l2_ops",
+    "<=>": "vector_cosine_ops",
+    "<#>": "vector_ip_ops",
+}
+# Same, for the compact column types used by two-stage retrieval.
+TYPED_OPERATOR_OPCLASSES: Dict[str, Dict[str, str]] = {
+    "vector": OPERATOR_OPCLASSES,
+    "halfvec": {
+        "<->": "halfvec_l2_ops",
+        "<=>": "halfvec_cosine_ops",
+        "<#>": "halfvec_ip_ops",
+    },
+    "bit": {
+        "<~>": "bit_hamming_ops",
+        "<%>": "bit_jaccard_ops",
+    },
+}
+
+ANN_METHODS = ("hnsw", "ivfflat")
+
+
+@dataclass(frozen=True)
+class VectorIndexSpec:
+    """Describe an ANN index expected by a repository query."""
+
+    table: str
+    column: str
+    name: str
+    operator: str
+    column_type: str = "vector"
+
+    @property
+    def opclass(self) -> str:
+        try:
+            return TYPED_OPERATOR_OPCLASSES[self.column_type][self.operator]
+        except KeyError as exc:
+            raise VectorIndexError(
+                f"Unsupported distance operator '{self.operator}' on {self.column_type}"
+            ) from exc
+
+
+@dataclass(frozen=True)
+class ExistingIndex:
+    name: str
+    method: str
+    opclass: str
+
+
+async def list_vector_indexes(conn: AsyncConnection, spec: VectorIndexSpec) -> List[ExistingIndex]:
+    """Return the valid ANN indexes built on the column described by ``spec``."""
+
+    async with conn.cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT i.relname, am.amname, opc.opcname
+            FROM pg_index x
+            JOIN pg_class t ON t.oid = x.indrelid
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_am am ON am.oid = i.relam
+            JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = x.indkey[0]
+            JOIN pg_opclass opc ON opc.oid = x.indclass[0]
+            WHERE t.relname = %s
+              AND a.attname = %s
+              AND x.indisvalid
+              AND am.amname = ANY(%s)
+            """,
+            (spec.table, spec.column, list(ANN_METHODS)),
+        )
+        rows = await cursor.fetchall()
+
+    return [ExistingIndex(name=row[0], method=row[1], opclass=row[2]) for row in rows]
+
+
+async def has_any_index(conn: AsyncConnection, spec: VectorIndexSpec) -> bool:
+    """Whether any index (valid or not, of any method) covers the ``spec`` column."""
+
+    async with conn.cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT EXISTS (
+                SELECT 1
+                FROM pg_index x
+                JOIN pg_class t ON t.oid = x.indrelid
+                JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = x.indkey[0]
+                WHERE t.relname = %s AND a.attname = %s
+            )
+            """,
+            (spec.table, spec.column),
+        )
+        row = await cursor.fetchone()
+
+    return bool(row and row[0])
+
+
+async def verify_vector_indexes(
+    conn: AsyncConnection, specs: Sequence[VectorIndexSpec]
+) -> None:
+    """Fail when a query operator has no ANN index built with the matching opclass."""
+
+    problems: List[str] = []
+
+    for spec in specs:
+        indexes = await list_vector_indexes(conn, spec)
+        if any(index.opclass == spec.opclass for index in indexes):
+            continue
+
+        if indexes:
+            found = ", ".join(f"{index.name} ({index.method}, {index.opclass})" for index in indexes)
+            problems.append(
+                f"{spec.table}.{spec.column} is queried with '{spec.operator}' "
+                f"which requires {spec.opclass}, but only found: {found}"
+            )
+        else:
+            problems.append(
+                f"{spec.table}.{spec.column} has no ANN index "
+                f"(expected {spec.opclass} for operator '{spec.operator}')"
+            )
+
+    if problems:
+        raise VectorIndexError(
+            "Vector index mismatch: "
+            + "; ".join(problems)
+            + ". Rebuild with `python -m app.interface.cli.vector_index build --rebuild`."
+        )
+
+
+def ivfflat_lists_for(row_count: int) -> int:
+    """Size IVFFlat lists following pgvector's guidance (rows/1000, then sqrt)."""
+
+    if settings.vector_index_ivfflat_lists > 0:
+        return settings.vector_index_ivfflat_lists
+
+    if row_count <= 1_000_000:
+        return max(1, row_count // 1000)
+
+    return max(1, int(math.sqrt(row_count)))
+
+
+async def build_vector_index(
+    conn: AsyncConnection,
+    spec: VectorIndexSpec,
+    *,
+    method: Optional[str] = None,
+    rebuild: bool = False,
+) -> str:
+    """Create (or rebuild) the ANN index for ``spec`` sized to the current corpus.
+
+    The connection must be in autocommit mode: the index is built
+    ``CONCURRENTLY`` under a temporary name and swapped in afterwards so the
+    table stays queryable during the rebuild.
+    """
+
+    method = method or settings.vector_index_method
+    if method not in ANN_METHODS:
+        raise VectorIndexError(f"Unsupported index method '{method}'")
+
+    existing = await list_vector_indexes(conn, spec)
+    if not rebuild and any(
+        index.name == spec.name and index.method == method and index.opclass == spec.opclass
+        for index in existing
+    ):
+        return f"{spec.name} already up to date ({method}, {spec.opclass})"
+
+    async with conn.cursor() as cursor:
+        await cursor.execute(
+            sql.SQL("SELECT count(*) FROM {} WHERE {} IS NOT NULL").format(
+                sql.Identifier(spec.table), sql.Identifier(spec.column)
+            )
+        )
+        row = await cursor.fetchone()
+    row_count = int(row[0]) if row else 0
+
+    if method == "hnsw":
+        options = sql.SQL("m = {}, ef_construction = {}").format(
+            sql.Literal(settings.vector_index_hnsw_m),
+            sql.Literal(settings.vector_index_hnsw_ef_construction),
+        )
+        description = (
+            f"hnsw m={settings.vector_index_hnsw_m} "
+            f"ef_construction={settings.vector_index_hnsw_ef_construction}"
+        )
+    else:
+        lists = ivfflat_lists_for(row_count)
+        options = sql.SQL("lists = {}").format(sql.Literal(lists))
+        description = f"ivfflat lists={lists}"
+
+    staging_name = f"{spec.name}_new"
+
+    await conn.execute(
+        sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(sql.Identifier(staging_name))
+    )
+    await conn.execute(
+        sql.SQL("CREATE INDEX CONCURRENTLY {} ON {} USING {} ({} {}) WITH ({})").format(
+            sql.Identifier(staging_name),
+            sql.Identifier(spec.table),
+            sql.SQL(method),
+            sql.Identifier(spec.column),
+            sql.SQL(spec.opclass),
+            options,
+        )
+    )
+    await conn.execute(
+        sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(sql.Identifier(spec.name))
+    )
+    await conn.execute(
+        sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+            sql.Identifier(staging_name), sql.Identifier(spec.name)
+        )
+    )
+
+    return f"{spec.name} built on {row_count} rows ({description}, {spec.opclass})"
+
+
+async def apply_search_parameters(
+    conn: AsyncConnection,
+    *,
+    limit: int,
+    probes: Optional[int] = None,
+    ef_search: Optional[int] = None,
+) -> None:
+    """Set the ANN recall/latency knobs for the current transaction only."""
+
+    probes = probes or settings.retriever_ivfflat_probes
+    # HNSW never returns more than ef_search candidates.
+    ef_search = max(ef_search or settings.retriever_hnsw_ef_search, limit)
+
+    await conn.execute(
+        "SELECT set_config('ivfflat.probes', %s, true), set_config('hnsw.ef_search', %s, true)",
+        (str(probes), str(ef_search)),
+        prepare=prepare_statement(),
+    )
+
+
+__all__ = [
+    "OPERATOR_OPCLASSES",
+    "TYPED_OPERATOR_OPCLASSES",
+    "VectorIndexError",
+    "VectorIndexSpec",
+    "apply_search_parameters",
+    "build_vector_index",
+    "has_any_index",
+    "ivfflat_lists_for",
+    "list_vector_indexes",
+    "verify_vector_indexes",
+]
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from app.config import settings
+from app.infrastructure.embeddings import warm_up_embeddings
+from app.infrastructure.ollama import preload_ollama_model
+
+logger = logging.getLogger(__name__)
+
+WARMUP_STEPS: List[Tuple[str, Callable[[], Awaitable[None]]]] = [
+    ("embedding_model", warm_up_embeddings),
+    ("ollama_model", preload_ollama_model),
+]
+
+_status: Dict[str, str] = {}
+_task: asyncio.Task[None] | None = None
+
+
+async def _run_warmup() -> None:
+    pending = list(WARMUP_STEPS)
+
+    while pending:
+        failed = []
+        for name, step in pending:
+            try:
+                await step()
+            except Exception as exc:  # pragma: no cover - any failure keeps the step pending
+                logger.warning("Warm-up step %s failed, retrying: %s", name, exc)
+                _status[name] = f"error: {exc}"
+                failed.append((name, step))
+            else:
+                logger.info("Warm-up step %s done", name)
+                _status[name] = "ready"
+
+        pending = failed
+        if pending:
+            await asyncio.sleep(max(1.0, settings.warmup_retry_seconds))
+
+
+def start_warmup() -> None:
+    """Preload the models in the background; readiness turns true once all succeed.
+
+    Without ``WARMUP_ENABLED`` the service is ready immediately and models are
+    loaded by the first request, as before.
+    """
+
+    global _task
+
+    if not settings.warmup_enabled:
+        _status.update({name: "ready" for name, _ in WARMUP_STEPS})
+        return
+
+    if _task is None:
+        _status.update({name: "pending" for name, _ in WARMUP_STEPS})
+        _task = asyncio.create_task(_run_warmup())
+
+
+async def stop_warmup() -> None:
+    """Cancel a warm-up still in progress."""
+
+    global _task
+    if _task is None:
+        return
+
+    _task.cancel()
+    await asyncio.gather(_task, return_exceptions=True)
+    _task = None
+
+
+def readiness() -> Tuple[bool, Dict[str, str]]:
+    """Return whether every warm-up step succeeded, with the per-step status."""
+
+    status = dict(_status)
+    return bool(status) and all(value == "ready" for value in status.values()), status
+
+
+__all__ = ["readiness", "start_warmup", "stop_warmup"]
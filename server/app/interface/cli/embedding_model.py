@@ -0,0 +1,106 @@
+"""Export the embedding model to ONNX and check its parity with the torch model.
+
+Usage (from ``server/``)::
+
+    python -m app.interface.cli.embedding_model export --output onnx_model [--quantize avx2]
+    python -m app.interface.cli.embedding_model parity [--file questions.txt] [--min-cosine 0.99]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List
+
+from app.config import settings
+from app.infrastructure.onnx_embeddings import (
+    QUANTIZATION_CONFIGS,
+    OnnxEmbeddingError,
+    compare_models,
+    export_onnx_model,
+    load_onnx_model,
+)
+
+SAMPLE_TEXTS = [
+    "Quelles sont les conditions d'accès à une PMSMP ?",
+    "Comment orienter une personne vers une structure d'insertion par l'activité économique ?",
+    "Quels sont les droits d'un salarié en contrat d'insertion ?",
+    "Comment accompagner une personne en situation de handicap psychique vers l'emploi ?",
+    "Qui peut prescrire un parcours d'accompagnement ?",
+    "Quelles aides pour la mobilité des demandeurs d'emploi ?",
+    "Académie France Travail : comment accéder aux formations ?",
+    "PMSMP",
+]
+
+
+def _read_texts(path: Path | None) -> List[str]:
+    if path is None:
+        return SAMPLE_TEXTS
+    return [line.strip() for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def _export(output: Path, quantize: str | None) -> None:
+    file_name = export_onnx_model(output, quantize)
+    print(f"ONNX model written to {output}")
+    print(
+        f"Set EMBEDDING_BACKEND=onnx EMBEDDING_ONNX_MODEL_PATH={output} "
+        f"EMBEDDING_ONNX_FILE_NAME={file_name}"
+    )
+
+
+def _parity(texts: List[str], min_cosine: float) -> None:
+    from sentence_transformers import SentenceTransformer
+
+    reference = SentenceTransformer(
+        settings.embedding_model,
+        device=settings.embedding_device,
+        trust_remote_code=settings.embedding_trust_remote_code,
+    )
+    candidate = load_onnx_model()
+
+    report = compare_models(reference, candidate, texts)
+    print(json.dumps(report.as_dict(), indent=2))
+
+    if report.min_cosine < min_cosine:
+        print(
+            f"Cosine drift too large: min {report.min_cosine:.6f} < {min_cosine}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export = subparsers.add_parser("export", help="Exporte EMBEDDING_MODEL au format ONNX.")
+    export.add_argument("--output", type=Path, required=True)
+    export.add_argument(
+        "--quantize",
+        choices=QUANTIZATION_CONFIGS,
+        default=None,
+        help="Quantification int8 dynamique pour le jeu d'instructions ciblé.",
+    )
+
+    parity = subparsers.add_parser(
+        "parity", help="Compare les vecteurs ONNX configurés à ceux du modèle torch."
+    )
+    parity.add_argument("--file", type=Path, default=None, help="Un texte par ligne.")
+    parity.add_argument("--min-cosine", type=float, default=0.99)
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "export":
+            _export(args.output, args.quantize)
+        else:
+            _parity(_read_texts(args.file), args.min_cosine)
+    except OnnxEmbeddingError as exc:
+        print(str(exc), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
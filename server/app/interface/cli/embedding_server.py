@@ -0,0 +1,92 @@
+"""Run the shared embedding process serving every API worker over a Unix socket.
+
+Usage (from ``server/``)::
+
+    python -m app.interface.cli.embedding_server --socket /run/chatbot/embeddings.sock
+
+Then start the API with ``EMBEDDING_SERVICE_SOCKET`` pointing to the same path.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from app.config import settings
+from app.infrastructure.embedding_batcher import EmbeddingBatcher
+from app.infrastructure.embedding_service import (
+    EmbeddingServiceSocketInUseError,
+    serve_embeddings,
+)
+from app.infrastructure.embeddings import WARMUP_TEXT, encode_locally
+
+DEFAULT_SOCKET = "/tmp/chatbot-embeddings.sock"
+
+logger = logging.getLogger(__name__)
+
+
+async def _serve(socket_path: str) -> None:
+    # Load the model before listening so workers only ever reach a warm service.
+    await encode_locally([WARMUP_TEXT])
+
+    # Single texts from all workers are coalesced into shared forward passes.
+    batcher = EmbeddingBatcher(
+        encode_locally,
+        max_batch_size=settings.embedding_batch_max_size,
+        max_wait_seconds=settings.embedding_batch_max_wait_ms / 1000,
+    )
+
+    async def encode(texts: List[str]) -> np.ndarray:
+        if len(texts) == 1:
+            return (await batcher.submit(texts[0]))[np.newaxis]
+        return await encode_locally(texts)
+
+    server = await serve_embeddings(socket_path, encode)
+    logger.info("Embedding service listening on %s", socket_path)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.close()
+        Path(socket_path).unlink(missing_ok=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--socket",
+        default=settings.embedding_service_socket or DEFAULT_SOCKET,
+        help="Chemin du socket Unix (EMBEDDING_SERVICE_SOCKET par défaut).",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=0,
+        help="Threads torch pour l'encodage (0 = valeur par défaut).",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.threads > 0 and settings.embedding_backend == "torch":
+        import torch
+
+        torch.set_num_threads(args.threads)
+
+    try:
+        asyncio.run(_serve(args.socket))
+    except KeyboardInterrupt:
+        pass
+    except EmbeddingServiceSocketInUseError as exc:
+        print(str(exc), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
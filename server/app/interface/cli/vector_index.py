@@ -0,0 +1,66 @@
+"""Manage the pgvector ANN indexes used by the retrieval queries.
+
+Usage (from ``server/``)::
+
+    python -m app.interface.cli.vector_index check
+    python -m app.interface.cli.vector_index build [--method hnsw|ivfflat] [--rebuild]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+
+from psycopg import AsyncConnection
+
+from app.config import settings
+from app.infrastructure.repositories.topics import managed_vector_indexes
+from app.infrastructure.vector_index import (
+    VectorIndexError,
+    build_vector_index,
+    verify_vector_indexes,
+)
+
+
+async def _check() -> None:
+    async with await AsyncConnection.connect(settings.database_url, autocommit=True) as conn:
+        await verify_vector_indexes(conn, managed_vector_indexes())
+    print("Vector indexes match the retrieval operators.")
+
+
+async def _build(method: str | None, rebuild: bool) -> None:
+    async with await AsyncConnection.connect(settings.database_url, autocommit=True) as conn:
+        for spec in managed_vector_indexes():
+            print(await build_vector_index(conn, spec, method=method, rebuild=rebuild))
+        await verify_vector_indexes(conn, managed_vector_indexes())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("check", help="Vérifie que les index correspondent aux opérateurs.")
+
+    build = subparsers.add_parser("build", help="Construit les index ANN dimensionnés au corpus.")
+    build.add_argument("--method", choices=["hnsw", "ivfflat"], default=None)
+    build.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Reconstruit l'index même s'il est déjà conforme (ex. après un gros chargement).",
+    )
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "check":
+            asyncio.run(_check())
+        else:
+            asyncio.run(_build(args.method, args.rebuild))
+    except VectorIndexError as exc:
+        print(str(exc), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
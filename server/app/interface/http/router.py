@@ -1,20 +1,27 @@
 from __future__ import annotations
-from typing import Dict, List
+from typing import Dict
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+from fastapi.responses import JSONResponse
 
 from app.interface.http.routes.ask import define_ask_routes
-from app.interface.http.routes.chat import ChatMessage, define_chat_routes
+from app.domain.services.chat_context import create_chat_context_manager
+from app.interface.http.routes.chat import define_chat_routes
+from app.infrastructure.conversation_store import create_conversation_store
+from app.infrastructure.metrics import render_metrics
+from app.infrastructure.warmup import readiness
 
 
 router = APIRouter()
 
-# Stockage en mémoire pour les conversations.
-conversation_store: Dict[str, List[ChatMessage]] = {}
+# Historique des conversations, borné (mémoire du processus ou Redis partagé).
+conversation_store = create_conversation_store()
+# Fenêtre de contexte bornée, avec résumé glissant des échanges anciens.
+chat_context = create_chat_context_manager(conversation_store)
 
 api_v1_router = APIRouter(prefix="/api/v1")
 
-define_chat_routes(api_v1_router, conversation_store)
+define_chat_routes(api_v1_router, conversation_store, chat_context)
 define_ask_routes(api_v1_router)
 
 
@@ -24,7 +31,24 @@ async def healthcheck() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+@api_v1_router.get("/readiness")
+async def readiness_check() -> JSONResponse:
+    """Disponibilité pour le trafic : 503 tant que les modèles ne sont pas chargés."""
+    ready, components = readiness()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "components": components},
+    )
+
+
+@api_v1_router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Exposition Prometheus des métriques applicatives."""
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+
 router.include_router(api_v1_router)
 
 
-__all__ = ["router"]
+__all__ = ["chat_context", "router"]
@@ -1,21 +1,39 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
+from typing import AsyncIterator
 
-from app.domain.models.ask import AskRequest, AskResponse
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import StreamingResponse
+
+from app.domain.models.ask import AskBatchRequest, AskBatchResponse, AskRequest, AskResponse
 from app.domain.services.ask import (
     AnswerGenerationError,
+    AnswerGenerationOverloadedError,
     AskServiceError,
     RetrievalServiceError,
     handle_ask,
+    handle_ask_batch,
+    stream_ask,
+    stream_ask_batch,
 )
+from app.infrastructure.timing import collect_server_timing
+from app.interface.http.sse import format_sse, sse_response
 
 
 def define_ask_routes(router: APIRouter) -> None:
     @router.post("/ask", response_model=AskResponse)
-    async def ask(request: AskRequest) -> AskResponse:
+    async def ask(request: AskRequest, response: Response) -> AskResponse:
         try:
-            return await handle_ask(request)
+            with collect_server_timing() as timing:
+                result = await handle_ask(request)
+            response.headers["Server-Timing"] = timing.header()
+            return result
+        except AnswerGenerationOverloadedError as exc:
+            raise HTTPException(
+                status_code=503,
+                detail=str(exc),
+                headers={"Retry-After": str(exc.retry_after)},
+            ) from exc
         except RetrievalServiceError as exc:
             raise HTTPException(status_code=502, detail=str(exc)) from exc
         except AnswerGenerationError as exc:
@@ -23,5 +41,87 @@ def define_ask_routes(router: APIRouter) -> None:
         except AskServiceError as exc:
             raise HTTPException(status_code=400, detail=str(exc)) from exc
 
+    @router.post("/ask/stream")
+    async def ask_stream(request: AskRequest) -> StreamingResponse:
+        """Stream the answer as Server-Sent Events.
+
+        Events: ``documents`` (citations, sent before generation starts),
+        ``token`` (answer pieces), then ``done`` or ``error``.
+        """
+
+        try:
+            documents, pieces = await stream_ask(request)
+        except RetrievalServiceError as exc:
+            raise HTTPException(status_code=502, detail=str(exc)) from exc
+        except AskServiceError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+        async def events() -> AsyncIterator[str]:
+            # Starlette cancels this generator when the client disconnects;
+            # closing ``pieces`` then aborts the upstream Ollama stream.
+            try:
+                yield format_sse(
+                    "documents",
+                    [document.model_dump() for document in documents],
+                )
+                async for piece in pieces:
+                    yield format_sse("token", {"content": piece})
+            except AnswerGenerationOverloadedError as exc:
+                yield format_sse(
+                    "error",
+                    {"status": 503, "detail": str(exc), "retry_after": exc.retry_after},
+                )
+            except AskServiceError as exc:
+                yield format_sse("error", {"status": 502, "detail": str(exc)})
+            else:
+                yield format_sse("done", {})
+            finally:
+                await pieces.aclose()
+
+        return sse_response(events())
+
+    @router.post("/ask/batch", response_model=AskBatchResponse)
+    async def ask_batch(request: AskBatchRequest, response: Response) -> AskBatchResponse:
+        """Answer several questions at once; ``results`` follow the question order.
+
+        Each item carries its own ``status``: a question that fails does not
+        fail the batch.
+        """
+
+        try:
+            with collect_server_timing() as timing:
+                result = await handle_ask_batch(request)
+            response.headers["Server-Timing"] = timing.header()
+            return result
+        except RetrievalServiceError as exc:
+            raise HTTPException(status_code=502, detail=str(exc)) from exc
+        except AskServiceError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    @router.post("/ask/batch/stream")
+    async def ask_batch_stream(request: AskBatchRequest) -> StreamingResponse:
+        """Stream the batch results as Server-Sent Events, as soon as each completes.
+
+        Events: ``result`` (one per question, with its ``index``), then ``done``.
+        """
+
+        try:
+            results = await stream_ask_batch(request)
+        except RetrievalServiceError as exc:
+            raise HTTPException(status_code=502, detail=str(exc)) from exc
+        except AskServiceError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+        async def events() -> AsyncIterator[str]:
+            # Closing ``results`` on disconnect cancels the pending generations.
+            try:
+                async for item in results:
+                    yield format_sse("result", item.model_dump())
+                yield format_sse("done", {})
+            finally:
+                await results.aclose()
+
+        return sse_response(events())
+
 
 __all__ = ["define_ask_routes"]
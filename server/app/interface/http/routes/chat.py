@@ -1,48 +1,139 @@
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Any, AsyncIterator, Dict, List, Tuple
 from uuid import uuid4
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
+from fastapi.responses import StreamingResponse
 
-from app.domain.services.chat import LLMServiceError, request_ollama_chat
+from app.domain.services.chat import (
+    LLMOverloadedError,
+    LLMServiceError,
+    request_ollama_chat,
+    stream_ollama_chat,
+)
 from app.domain.models.chat import ChatMessage, ChatRequest, ChatResponse
+from app.domain.services.chat_context import ChatContextManager, new_message
+from app.infrastructure.conversation_store import ConversationStore
+from app.infrastructure.timing import collect_server_timing, timed_stage
+from app.interface.http.sse import format_sse, sse_response
 
 
 def define_chat_routes(
     router: APIRouter,
-    conversation_store: Dict[str, List[ChatMessage]],
+    conversation_store: ConversationStore,
+    context_manager: ChatContextManager,
 ) -> None:
-    @router.post("/chat", response_model=ChatResponse)
-    async def chat(request: ChatRequest) -> ChatResponse:
+    async def start_turn(
+        request: ChatRequest,
+    ) -> Tuple[str, Dict[str, Any], List[Dict[str, str]]]:
         prompt = request.prompt.strip()
         if not prompt:
             raise HTTPException(status_code=422, detail="Le prompt ne peut pas être vide.")
 
         conversation_id = request.conversation_id or str(uuid4())
-        history = conversation_store.setdefault(conversation_id, [])
+        user_message = new_message("user", prompt)
+
+        with timed_stage("history"):
+            history = await conversation_store.load(conversation_id)
+            history_payload = await context_manager.build_messages(
+                conversation_id, history, user_message
+            )
 
-        user_message = ChatMessage(role="user", content=prompt)
-        history.append(user_message)
+        return conversation_id, user_message, history_payload
 
-        history_payload = [
-            {"role": message.role, "content": message.content}
-            for message in history
-        ]
+    async def finish_turn(
+        conversation_id: str, user_message: Dict[str, Any], content: str
+    ) -> ChatMessage:
+        # The turn is only persisted once the reply is complete, so a failed
+        # or interrupted generation leaves the stored history untouched.
+        assistant_message = ChatMessage(role="assistant", content=content)
+        with timed_stage("history_store"):
+            await conversation_store.append(
+                conversation_id,
+                [user_message, new_message("assistant", content)],
+            )
+        return assistant_message
+
+    @router.post("/chat", response_model=ChatResponse)
+    async def chat(request: ChatRequest, response: Response) -> ChatResponse:
+        with collect_server_timing() as timing:
+            conversation_id, user_message, history_payload = await start_turn(request)
 
-        try:
-            assistant_content = await request_ollama_chat(history_payload)
-        except LLMServiceError as error:
-            raise HTTPException(status_code=502, detail=str(error)) from error
+            try:
+                assistant_content = await request_ollama_chat(
+                    history_payload, affinity=conversation_id
+                )
+            except LLMOverloadedError as error:
+                raise HTTPException(
+                    status_code=503,
+                    detail=str(error),
+                    headers={"Retry-After": str(error.retry_after)},
+                ) from error
+            except LLMServiceError as error:
+                raise HTTPException(status_code=502, detail=str(error)) from error
 
-        assistant_message = ChatMessage(role="assistant", content=assistant_content)
-        history.append(assistant_message)
+            assistant_message = await finish_turn(
+                conversation_id, user_message, assistant_content
+            )
+
+        response.headers["Server-Timing"] = timing.header()
 
         return ChatResponse(
             conversation_id=conversation_id,
             assistant_message=assistant_message,
         )
 
+    @router.post("/chat/stream")
+    async def chat_stream(request: ChatRequest) -> StreamingResponse:
+        """Stream the assistant reply as Server-Sent Events.
+
+        Events: ``conversation`` (identifier), ``token`` (reply pieces), then
+        ``done`` (full assistant message) or ``error``.
+        """
+
+        conversation_id, user_message, history_payload = await start_turn(request)
+
+        async def events() -> AsyncIterator[str]:
+            pieces = stream_ollama_chat(history_payload, affinity=conversation_id)
+            chunks: List[str] = []
+            # Starlette cancels this generator when the client disconnects;
+            # closing ``pieces`` then aborts the upstream Ollama stream.
+            try:
+                yield format_sse("conversation", {"conversation_id": conversation_id})
+                async for piece in pieces:
+                    chunks.append(piece)
+                    yield format_sse("token", {"content": piece})
+
+                content = "".join(chunks).strip()
+                if not content:
+                    yield format_sse(
+                        "error",
+                        {"status": 502, "detail": "LLM response missing assistant content"},
+                    )
+                    return
+
+                assistant_message = await finish_turn(conversation_id, user_message, content)
+                yield format_sse(
+                    "done",
+                    ChatResponse(
+                        conversation_id=conversation_id,
+                        assistant_message=assistant_message,
+                    ).model_dump(),
+                )
+            except LLMOverloadedError as error:
+                yield format_sse(
+                    "error",
+                    {"status": 503, "detail": str(error), "retry_after": error.retry_after},
+                )
+            except LLMServiceError as error:
+                yield format_sse("error", {"status": 502, "detail": str(error)})
+            finally:
+                await pieces.aclose()
+
+        return sse_response(events())
+
+
 __all__ = [
     "define_chat_routes",
 ]
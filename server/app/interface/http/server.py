@@ -1,12 +1,21 @@
 from __future__ import annotations
 
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
-from app.interface.http.router import router
-from app.infrastructure.database import close_pool, init_pool
+from app.interface.http.router import chat_context, router
+from app.infrastructure.database import close_pool, get_pool, init_pool
+from app.infrastructure.embeddings import close_embeddings
+from app.infrastructure.ollama import close_ollama_client, init_ollama_client
+from app.infrastructure.redis_client import close_redis, init_redis
+from app.infrastructure.repositories.topics import active_vector_indexes
+from app.infrastructure.vector_index import has_any_index, verify_vector_indexes
+from app.infrastructure.warmup import start_warmup, stop_warmup
 
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="IA Custom Chatbot API", version="0.1.0")
 
@@ -24,10 +33,44 @@ app.include_router(router)
 @app.on_event("startup")
 async def _startup() -> None:
     await init_pool()
+    await init_ollama_client()
+    await init_redis()
+
+    if settings.vector_index_check_on_startup:
+        await _check_vector_indexes()
+
+    # Models load in the background: /healthcheck answers right away while
+    # /readiness only succeeds once the service is warm.
+    start_warmup()
+
+
+async def _check_vector_indexes() -> None:
+    specs = active_vector_indexes()
+    async with get_pool().connection() as conn:
+        # Databases created before topic_chunks existed have no chunk index until
+        # the loader runs: chunk search falls back to whole topics per request
+        # meanwhile. An index that exists but cannot serve the queries still fails.
+        missing = [
+            spec
+            for spec in specs
+            if spec.table == "topic_chunks" and not await has_any_index(conn, spec)
+        ]
+        if missing:
+            logger.warning(
+                "No vector index on %s yet (run the loader): questions are answered from "
+                "whole topics while topic_chunks is missing or empty.",
+                ", ".join(f"{spec.table}.{spec.column}" for spec in missing),
+            )
+        await verify_vector_indexes(conn, [spec for spec in specs if spec not in missing])
 
 
 @app.on_event("shutdown")
 async def _shutdown() -> None:
+    await stop_warmup()
+    await chat_context.close()
+    await close_embeddings()
+    await close_ollama_client()
+    await close_redis()
     await close_pool()
 
 
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import json
+from typing import Dict
+
+from fastapi.responses import StreamingResponse
+
+# Disable proxy buffering (nginx) so events reach the browser immediately.
+SSE_HEADERS: Dict[str, str] = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse(event: str, data: object) -> str:
+    """Serialise one Server-Sent Event with a JSON payload."""
+
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def sse_response(events: object) -> StreamingResponse:
+    """Wrap an async iterator of formatted events into a streaming response."""
+
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+__all__ = ["format_sse", "sse_response"]
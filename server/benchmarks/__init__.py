@@ -0,0 +1 @@
+"""Offline performance benchmarks (fake Ollama, fake embedder, fixture corpus)."""
@@ -0,0 +1,138 @@
+"""Benchmark corpus fixture and the in-memory retriever serving it.
+
+Regenerate the fixture from the scraped topics (from ``server/``)::
+
+    python -m benchmarks.corpus --source ../data/topics.json --size 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+FIXTURE_PATH = Path(__file__).resolve().parent / "fixtures" / "corpus.json"
+CONTENT_CHAR_LIMIT = 3000
+
+_NON_TEXT = re.compile(r"[^\w\s'’,.;:?!()«»-]+")
+
+
+def _clean(text: str | None) -> str:
+    return " ".join(_NON_TEXT.sub(" ", text or "").split())
+
+
+def build_fixture(topics: Sequence[Mapping[str, Any]], size: int) -> Dict[str, Any]:
+    """Keep the first ``size`` topics with content and derive one question per topic."""
+
+    documents: List[Dict[str, Any]] = []
+    questions: List[str] = []
+
+    for topic in topics:
+        content = (topic.get("content") or "").strip()
+        title = _clean(topic.get("title"))
+        if not content or not title:
+            continue
+
+        documents.append(
+            {
+                "id": len(documents) + 1,
+                "title": title,
+                "subtitle": _clean(topic.get("subtitle")) or None,
+                "url": topic.get("url"),
+                "content": content[:CONTENT_CHAR_LIMIT],
+            }
+        )
+        questions.append(f"Que faut-il savoir sur : {title.rstrip(' ?.!')} ?")
+
+        if len(documents) >= size:
+            break
+
+    return {"documents": documents, "questions": questions}
+
+
+def load_fixture(path: Path = FIXTURE_PATH) -> Dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+class InMemoryRetriever:
+    """Exact cosine search over the fixture, with a simulated database round trip.
+
+    Implements :class:`app.infrastructure.retrievers.VectorRetriever`; the
+    fixture has no chunks, so chunk search ranks whole topics.
+    """
+
+    def __init__(
+        self,
+        documents: Sequence[Mapping[str, Any]],
+        vectors: Sequence[Sequence[float]],
+        latency_seconds: float,
+    ) -> None:
+        import numpy as np
+
+        self.documents = list(documents)
+        self.latency_seconds = latency_seconds
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self._matrix = matrix / np.where(norms == 0, 1.0, norms)
+
+    async def search_topics(
+        self,
+        embedding: Sequence[float],
+        limit: int,
+        *,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Mapping[str, object]]:
+        import numpy as np
+
+        if self.latency_seconds > 0:
+            await asyncio.sleep(self.latency_seconds)
+
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        scores = self._matrix @ (query / norm if norm > 0 else query)
+        order = np.argsort(-scores)[:limit]
+
+        return [
+            {**self.documents[index], "similarity": 1.0 / (2.0 - float(scores[index]))}
+            for index in order
+        ]
+
+    async def search_chunks(
+        self,
+        embedding: Sequence[float],
+        limit: int,
+        *,
+        chunks_per_topic: int,
+        candidates: int,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Mapping[str, object]]:
+        return await self.search_topics(embedding, limit)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", type=Path, default=Path("../data/topics.json"))
+    parser.add_argument("--size", type=int, default=40)
+    parser.add_argument("--output", type=Path, default=FIXTURE_PATH)
+    args = parser.parse_args()
+
+    topics = json.loads(args.source.read_text(encoding="utf-8"))
+    fixture = build_fixture(topics, args.size)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(
+        json.dumps(fixture, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+    )
+    print(f"{len(fixture['documents'])} documents written to {args.output}")
+
+
+__all__ = ["FIXTURE_PATH", "InMemoryRetriever", "build_fixture", "load_fixture"]
+
+
+if __name__ == "__main__":
+    main()
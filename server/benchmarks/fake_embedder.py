@@ -0,0 +1,53 @@
+"""Deterministic stand-in for the SentenceTransformer model."""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import time
+from typing import Any, Sequence
+
+import numpy as np
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbedder:
+    """Hashed bag-of-words vectors: identical texts map to identical vectors and
+    texts sharing words are close, so retrieval over the fixture stays meaningful.
+
+    ``encode`` sleeps ``batch_latency + per_text_latency * len(texts)`` to stand
+    in for the model forward pass; it runs in a worker thread like the real one.
+    """
+
+    def __init__(
+        self,
+        dimensions: int,
+        batch_latency: float = 0.0,
+        per_text_latency: float = 0.0,
+    ) -> None:
+        self.dimensions = dimensions
+        self.batch_latency = batch_latency
+        self.per_text_latency = per_text_latency
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in _WORD.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            vector[0] = 1.0
+            return vector
+        return vector / norm
+
+    def encode(self, texts: Sequence[str], **_: Any) -> np.ndarray:
+        delay = self.batch_latency + self.per_text_latency * len(texts)
+        if delay > 0:
+            time.sleep(delay)
+        return np.stack([self._vector(text) for text in texts])
+
+
+__all__ = ["HashingEmbedder"]
@@ -0,0 +1,141 @@
+"""Local stand-in for the Ollama HTTP API, streaming NDJSON at a controlled pace."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+ANSWER_WORDS = (
+    "D'après [Doc1], l'accompagnement repose sur un diagnostic partagé avec la personne, "
+    "puis sur un parcours adapté mobilisant les dispositifs disponibles ; [Doc2] précise "
+    "les démarches auprès des prescripteurs et les délais habituels."
+).split()
+
+
+@dataclass
+class FakeOllamaConfig:
+    first_token_latency: float = 0.2
+    tokens_per_second: float = 50.0
+    answer_tokens: int = 120
+
+
+class FakeOllamaServer:
+    """Minimal HTTP/1.1 server for ``/api/chat`` (streamed), ``/api/generate``, ``/api/version``.
+
+    Chat replies stream ``answer_tokens`` NDJSON chunks: the first after
+    ``first_token_latency`` seconds, then one every ``1 / tokens_per_second``.
+    The final chunk carries ``prompt_eval_count`` / ``eval_count`` /
+    ``eval_duration`` like Ollama. Connections are kept alive, as httpx pools them.
+    """
+
+    def __init__(self, config: FakeOllamaConfig) -> None:
+        self.config = config
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    @property
+    def base_url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("Fake Ollama server is not started")
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", "0"))
+                body = json.loads(await reader.readexactly(length)) if length else {}
+                path = request_line.decode("latin-1").split(" ")[1]
+
+                if path == "/api/chat":
+                    await self._stream_chat(writer, body)
+                elif path == "/api/generate":
+                    await self._send_json(writer, 200, {"model": body.get("model"), "done": True})
+                elif path == "/api/version":
+                    await self._send_json(writer, 200, {"version": "0.0.0-fake"})
+                else:
+                    await self._send_json(writer, 404, {"error": "not found"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Any) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def _write_chunk(self, writer: asyncio.StreamWriter, payload: Any) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+        writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+        await writer.drain()
+
+    async def _stream_chat(self, writer: asyncio.StreamWriter, body: Dict[str, Any]) -> None:
+        config = self.config
+        prompt_chars = sum(len(message.get("content", "")) for message in body.get("messages", []))
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+        await writer.drain()
+
+        await asyncio.sleep(config.first_token_latency)
+        interval = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+        started = time.perf_counter()
+
+        for index in range(config.answer_tokens):
+            if index and interval:
+                await asyncio.sleep(interval)
+            word = ANSWER_WORDS[index % len(ANSWER_WORDS)]
+            await self._write_chunk(
+                writer,
+                {
+                    "model": body.get("model"),
+                    "message": {"role": "assistant", "content": f"{word} "},
+                    "done": False,
+                },
+            )
+
+        await self._write_chunk(
+            writer,
+            {
+                "model": body.get("model"),
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+                "prompt_eval_count": max(1, prompt_chars // 4),
+                "eval_count": config.answer_tokens,
+                "eval_duration": int((time.perf_counter() - started) * 1e9),
+            },
+        )
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+__all__ = ["FakeOllamaConfig", "FakeOllamaServer"]
@@ -0,0 +1,357 @@
+"""Offline latency benchmark for ``handle_ask`` and ``POST /api/v1/chat``.
+
+Runs without network, database or models: a local fake Ollama server streams
+NDJSON tokens, a hashing embedder stands in for SentenceTransformer and the
+retriever serves a fixture derived from ``data/topics.json``. Usage (from
+``server/``)::
+
+    python -m benchmarks.run --requests 200 --concurrency 8
+    python -m benchmarks.run --update-baseline      # record the reference
+    python -m benchmarks.run --tolerance 0.15       # exit 1 on regression
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import resource
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+from benchmarks.corpus import FIXTURE_PATH, InMemoryRetriever, load_fixture
+from benchmarks.fake_embedder import HashingEmbedder
+from benchmarks.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+PERCENTILES = (50, 95, 99)
+
+Durations = Dict[str, float]
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int
+    concurrency: int
+    wall_seconds: float
+    peak_rss_mb: float
+    errors: int = 0
+    stages: Dict[str, List[float]] = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "concurrency": self.concurrency,
+            "errors": self.errors,
+            "throughput_rps": round(self.throughput, 3),
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "stages_ms": {
+                stage: {
+                    f"p{q}": round(percentile(values, q) * 1000, 2) for q in PERCENTILES
+                }
+                for stage, values in sorted(self.stages.items())
+            },
+        }
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile (``q`` in 0-100)."""
+
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(q / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _parse_server_timing(header: str) -> Durations:
+    durations: Durations = {}
+    for entry in header.split(","):
+        name, _, params = entry.strip().partition(";")
+        if params.startswith("dur="):
+            durations[name] = float(params[4:]) / 1000
+    return durations
+
+
+async def _run_scenario(
+    name: str,
+    call: Callable[[int], Awaitable[Durations]],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> ScenarioResult:
+    for index in range(warmup):
+        await call(index)
+
+    result = ScenarioResult(name, requests, concurrency, 0.0, 0.0)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            try:
+                durations = await call(index)
+            except Exception as exc:  # pragma: no cover - reported, not raised
+                result.errors += 1
+                print(f"[{name}] request {index} failed: {exc!r}", file=sys.stderr)
+                return
+            for stage, seconds in durations.items():
+                result.stages.setdefault(stage, []).append(seconds)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    result.wall_seconds = time.perf_counter() - started
+    result.peak_rss_mb = _peak_rss_mb()
+    return result
+
+
+def _configure(args: argparse.Namespace, ollama_url: str) -> None:
+    from app.config import settings
+
+    settings.ollama_base_url = ollama_url
+    settings.redis_url = None
+    settings.conversation_store_backend = "memory"
+    # The fixture retriever is vector-only and there is no corpus revision table.
+    settings.retriever_mode = "vector"
+    settings.retriever_granularity = "topic"
+    settings.answer_cache_enabled = False
+    settings.embedding_cache_enabled = args.embedding_cache
+    if args.ollama_max_in_flight:
+        settings.ollama_max_in_flight = args.ollama_max_in_flight
+
+
+async def _ask_scenario(questions: Sequence[str]) -> Callable[[int], Awaitable[Durations]]:
+    from app.domain.models.ask import AskRequest
+    from app.domain.services.ask import handle_ask
+    from app.infrastructure.timing import collect_server_timing
+
+    async def call(index: int) -> Durations:
+        request = AskRequest(question=questions[index % len(questions)])
+        with collect_server_timing() as timing:
+            await handle_ask(request)
+        return timing.durations()
+
+    return call
+
+
+async def _chat_scenario(
+    questions: Sequence[str], concurrency: int, turns: int
+) -> tuple[Callable[[int], Awaitable[Durations]], Callable[[], Awaitable[None]]]:
+    import httpx
+    from fastapi import FastAPI
+
+    from app.interface.http.router import chat_context, router
+
+    app = FastAPI()
+    app.include_router(router)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    async def call(index: int) -> Durations:
+        # Each worker slot replays a conversation of ``turns`` turns, so history grows.
+        conversation = f"bench-{index % concurrency}-{index // (concurrency * turns)}"
+        started = time.perf_counter()
+        response = await client.post(
+            "/api/v1/chat",
+            json={"prompt": questions[index % len(questions)], "conversation_id": conversation},
+        )
+        response.raise_for_status()
+        durations = _parse_server_timing(response.headers.get("server-timing", ""))
+        durations["client_total"] = time.perf_counter() - started
+        return durations
+
+    async def close() -> None:
+        await client.aclose()
+        await chat_context.close()
+
+    return call, close
+
+
+def compare_to_baseline(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+    min_delta_ms: float,
+) -> List[str]:
+    """Return one message per metric that regressed beyond ``tolerance``."""
+
+    regressions: List[str] = []
+
+    for scenario, reference in baseline.items():
+        current = results.get(scenario)
+        if current is None:
+            continue
+
+        if current["errors"]:
+            regressions.append(f"{scenario}: {current['errors']} failed requests")
+
+        if current["throughput_rps"] < reference["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{scenario}: throughput {current['throughput_rps']:.2f} rps "
+                f"< baseline {reference['throughput_rps']:.2f} rps"
+            )
+
+        for stage, expected in reference["stages_ms"].items():
+            measured = current["stages_ms"].get(stage)
+            if measured is None:
+                continue
+            for key in ("p50", "p95"):
+                limit = expected[key] * (1 + tolerance)
+                if measured[key] > limit and measured[key] - expected[key] > min_delta_ms:
+                    regressions.append(
+                        f"{scenario}/{stage}: {key} {measured[key]:.1f} ms "
+                        f"> baseline {expected[key]:.1f} ms"
+                    )
+
+    return regressions
+
+
+def _print_report(results: Dict[str, Dict[str, Any]]) -> None:
+    for scenario, summary in results.items():
+        print(
+            f"\n== {scenario}: {summary['requests']} requests, concurrency "
+            f"{summary['concurrency']}, {summary['throughput_rps']:.2f} req/s, "
+            f"peak RSS {summary['peak_rss_mb']:.1f} MB, {summary['errors']} errors"
+        )
+        print(f"{'stage':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for stage, values in summary["stages_ms"].items():
+            print(f"{stage:<16}{values['p50']:>10.1f}{values['p95']:>10.1f}{values['p99']:>10.1f}")
+
+
+async def _main(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    fixture = load_fixture(args.fixture)
+    questions: List[str] = fixture["questions"]
+
+    fake = FakeOllamaServer(
+        FakeOllamaConfig(
+            first_token_latency=args.first_token_ms / 1000,
+            tokens_per_second=args.tokens_per_second,
+            answer_tokens=args.answer_tokens,
+        )
+    )
+    await fake.start()
+    _configure(args, fake.base_url)
+
+    from app.config import settings
+    from app.infrastructure.embeddings import close_embeddings, use_embedding_model
+    from app.infrastructure.ollama import close_ollama_client, init_ollama_client
+    from app.infrastructure.retrievers import set_vector_retriever
+
+    embedder = HashingEmbedder(
+        settings.embedding_expected_dimensions,
+        batch_latency=args.embed_batch_ms / 1000,
+        per_text_latency=args.embed_text_ms / 1000,
+    )
+    use_embedding_model(embedder)
+    documents = fixture["documents"]
+    set_vector_retriever(
+        InMemoryRetriever(
+            documents,
+            HashingEmbedder(settings.embedding_expected_dimensions).encode(
+                [f"{doc['title']} {doc['subtitle'] or ''} {doc['content']}" for doc in documents]
+            ),
+            latency_seconds=args.db_latency_ms / 1000,
+        )
+    )
+    await init_ollama_client()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        if "ask" in args.scenarios:
+            call = await _ask_scenario(questions)
+            result = await _run_scenario(
+                "ask", call, args.requests, args.concurrency, args.warmup
+            )
+            results["ask"] = result.summary()
+
+        if "chat" in args.scenarios:
+            call, close = await _chat_scenario(questions, args.concurrency, args.chat_turns)
+            try:
+                result = await _run_scenario(
+                    "chat", call, args.requests, args.concurrency, args.warmup
+                )
+            finally:
+                await close()
+            results["chat"] = result.summary()
+    finally:
+        await close_embeddings()
+        await close_ollama_client()
+        set_vector_retriever(None)
+        await fake.close()
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=["ask", "chat"], default=["ask", "chat"])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5, help="Requêtes ignorées avant mesure.")
+    parser.add_argument("--chat-turns", type=int, default=6, help="Tours par conversation.")
+    parser.add_argument("--fixture", type=Path, default=FIXTURE_PATH)
+    parser.add_argument("--first-token-ms", type=float, default=200.0)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    parser.add_argument("--embed-batch-ms", type=float, default=15.0)
+    parser.add_argument("--embed-text-ms", type=float, default=2.0)
+    parser.add_argument("--db-latency-ms", type=float, default=3.0)
+    parser.add_argument("--embedding-cache", action="store_true")
+    parser.add_argument("--ollama-max-in-flight", type=int, default=None)
+    parser.add_argument("--output", type=Path, default=None, help="Écrit les résultats en JSON.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=5.0,
+        help="Écart absolu minimal pour signaler une régression (bruit de mesure).",
+    )
+    args = parser.parse_args()
+
+    if not args.update_baseline and not args.baseline.exists():
+        # A missing reference must not turn the regression gate into a no-op.
+        print(
+            f"No baseline at {args.baseline}; run with --update-baseline to record one.",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    results = asyncio.run(_main(args))
+    _print_report(results)
+
+    payload = json.dumps(results, indent=2, ensure_ascii=False) + "\n"
+    if args.output:
+        args.output.write_text(payload, encoding="utf-8")
+
+    if args.update_baseline:
+        args.baseline.write_text(payload, encoding="utf-8")
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = compare_to_baseline(results, baseline, args.tolerance, args.min_delta_ms)
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSION (tolerance {args.tolerance:.0%}):", file=sys.stderr)
+        for message in regressions:
+            print(f"  - {message}", file=sys.stderr)
+        sys.exit(1)
+
+    print("\nNo regression against the baseline.")
+
+
+if __name__ == "__main__":
+    main()